@@ -1,9 +1,19 @@
 """Analysis and recommendation logic for nutrition tracking."""
-from typing import Dict, Tuple
+import asyncio
+import copy
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
 from nutrition_db import NutritionDB
 from meal_diary import MealDiary
-from openai_service import OpenAIService
+from openai_service import get_openai_service
 from pregnancy_profile import pregnancy_profile
+from response_cache import ResponseCache
+
+# Analyses are reused until the user's diary changes (new meal) or the day
+# rolls over. The weekly window also slides with the clock, so weekly
+# entries expire after a few minutes even without new meals.
+_daily_analysis_cache = ResponseCache(maxsize=256, ttl=3600)
+_weekly_analysis_cache = ResponseCache(maxsize=256, ttl=300)
 
 
 class NutritionAnalyzer:
@@ -13,22 +23,80 @@ class NutritionAnalyzer:
         """Initialize analyzer with required services."""
         self.nutrition_db = NutritionDB()
         self.meal_diary = MealDiary()
-        self.openai_service = OpenAIService()
+        self.openai_service = get_openai_service()
+    
+    def _analysis_cache_key(self, user_id: int) -> str:
+        """Key an analysis on the user, their diary version and the current day."""
+        return f"{user_id}:{self.meal_diary.get_last_meal_id(user_id)}:{date.today().isoformat()}"
+    
+    def _cached_analysis(self, cache: ResponseCache, compute: Callable[[int], Dict], user_id: int) -> Dict:
+        """
+        Get the analysis for the user's current diary version, computing it on a miss.
+        
+        Args:
+            cache: Daily or weekly analysis cache
+            compute: Builds the analysis from the diary (blocking database reads)
+            user_id: Telegram user ID
+        
+        Returns:
+            A copy of the cached analysis, safe for the caller to modify
+        """
+        cache_key = self._analysis_cache_key(user_id)
+        analysis = cache.get(cache_key)
+        if analysis is None:
+            analysis = compute(user_id)
+            cache.set(cache_key, analysis)
+        return copy.deepcopy(analysis)
     
-    def analyze_daily_intake(self, user_id: int) -> Dict:
+    async def analyze_daily_intake(self, user_id: int, with_recommendations: bool = True) -> Dict:
         """
         Analyze daily nutrition intake and identify gaps.
         
+        Repeated calls with an unchanged diary return the cached analysis.
+        
         Args:
             user_id: Telegram user ID
+            with_recommendations: Also generate meal recommendations (an LLM call;
+                skip it when only the numbers are needed or the text is streamed)
         
         Returns:
             Dictionary with analysis results
         """
+        # Diary queries block, so they run in a worker thread; daily and
+        # weekly analyses gathered together then really overlap
+        analysis = await asyncio.to_thread(
+            self._cached_analysis, _daily_analysis_cache, self._daily_analysis, user_id
+        )
+        
+        if with_recommendations:
+            # Unchanged gaps give an identical request, answered from the completion cache
+            analysis["recommendations"] = await self.openai_service.generate_recommendations(
+                analysis["missing_nutrients"], analysis["totals"], analysis["requirements"]
+            )
+        return analysis
+    
+    def _daily_analysis(self, user_id: int) -> Dict:
+        """Compute the daily totals, gaps and percentages (no recommendations)."""
         # Use trimester-adjusted requirements
-        requirements = pregnancy_profile.get_adjusted_requirements()
-        totals = self.meal_diary.get_daily_totals(user_id)
-        meals = self.meal_diary.get_daily_meals(user_id)
+        requirements = pregnancy_profile.get_adjusted_requirements().copy()
+        return self._gap_analysis(requirements, self.meal_diary.get_daily_meals(user_id))
+    
+    def _gap_analysis(self, requirements: Dict[str, float], meals: List[Dict]) -> Dict:
+        """
+        Compare the nutrients of the given meals with the requirements.
+        
+        Every analysis (daily, weekly and the batch path) goes through here,
+        so they all report the same gaps for the same diary.
+        
+        Args:
+            requirements: Nutrient targets for the period
+            meals: Meals logged in the period
+        
+        Returns:
+            Dictionary with requirements, totals, gaps, percentages,
+            missing_nutrients and meal_count
+        """
+        totals = self.meal_diary.sum_nutrients(meals)
         
         # Calculate gaps
         gaps = {}
@@ -39,11 +107,7 @@ class NutritionAnalyzer:
             gaps[nutrient] = gap
             percentages[nutrient] = (consumed / required * 100) if required > 0 else 0
         
-        # Generate recommendations
         missing_nutrients = {k: v for k, v in gaps.items() if v > 0}
-        recommendations = self.openai_service.generate_recommendations(
-            missing_nutrients, totals, requirements
-        )
         
         return {
             "requirements": requirements,
@@ -51,50 +115,78 @@ class NutritionAnalyzer:
             "gaps": gaps,
             "percentages": percentages,
             "missing_nutrients": missing_nutrients,
-            "recommendations": recommendations,
             "meal_count": len(meals)
         }
     
-    def analyze_weekly_intake(self, user_id: int) -> Dict:
+    async def analyze_weekly_intake(self, user_id: int, with_recommendations: bool = True) -> Dict:
         """
         Analyze weekly nutrition intake and identify gaps.
         
+        Repeated calls with an unchanged diary return the cached analysis
+        for a few minutes.
+        
         Args:
             user_id: Telegram user ID
+            with_recommendations: Also generate meal recommendations (an LLM call;
+                skip it when only the numbers are needed or the text is streamed)
         
         Returns:
             Dictionary with analysis results
         """
+        # Diary queries block, so they run in a worker thread; daily and
+        # weekly analyses gathered together then really overlap
+        analysis = await asyncio.to_thread(
+            self._cached_analysis, _weekly_analysis_cache, self._weekly_analysis, user_id
+        )
+        
+        if with_recommendations:
+            # Unchanged gaps give an identical request, answered from the completion cache
+            analysis["recommendations"] = await self.openai_service.generate_recommendations(
+                analysis["missing_nutrients"], analysis["totals"], analysis["requirements"]
+            )
+        return analysis
+    
+    def _weekly_analysis(self, user_id: int) -> Dict:
+        """Compute the weekly totals, gaps and percentages (no recommendations)."""
         # Use trimester-adjusted requirements (multiply daily by 7)
         daily_req = pregnancy_profile.get_adjusted_requirements()
         requirements = {k: v * 7 for k, v in daily_req.items()}
-        totals = self.meal_diary.get_weekly_totals(user_id)
-        meals = self.meal_diary.get_weekly_meals(user_id)
+        return self._gap_analysis(requirements, self.meal_diary.get_weekly_meals(user_id))
+    
+    def _daily_analyses_for(self, user_ids: List[int]) -> List[Dict]:
+        """Get each user's daily analysis, as the interactive path does (blocking database reads)."""
+        return [
+            self._cached_analysis(_daily_analysis_cache, self._daily_analysis, user_id)
+            for user_id in user_ids
+        ]
+    
+    async def submit_batch_recommendations(self, user_ids: List[int]) -> Optional[str]:
+        """
+        Queue today's recommendations for many users on the OpenAI Batch API.
         
-        # Calculate gaps
-        gaps = {}
-        percentages = {}
-        for nutrient, required in requirements.items():
-            consumed = totals.get(nutrient, 0)
-            gap = required - consumed
-            gaps[nutrient] = gap
-            percentages[nutrient] = (consumed / required * 100) if required > 0 else 0
+        For nightly jobs: results arrive within 24h at half price and are
+        collected with openai_service.poll_batch, keyed by user ID.
         
-        # Generate recommendations
-        missing_nutrients = {k: v for k, v in gaps.items() if v > 0}
-        recommendations = self.openai_service.generate_recommendations(
-            missing_nutrients, totals, requirements
-        )
+        Args:
+            user_ids: Telegram user IDs
         
-        return {
-            "requirements": requirements,
-            "totals": totals,
-            "gaps": gaps,
-            "percentages": percentages,
-            "missing_nutrients": missing_nutrients,
-            "recommendations": recommendations,
-            "meal_count": len(meals)
-        }
+        Returns:
+            Batch ID, or None if no user has missing nutrients
+        """
+        # Diary queries block, so all users' analyses are read in one worker
+        # thread; they are the same analyses analyze_daily_intake uses
+        analyses = await asyncio.to_thread(self._daily_analyses_for, user_ids)
+        jobs = [
+            {
+                "custom_id": user_id,
+                "missing_nutrients": analysis["missing_nutrients"],
+                "daily_totals": analysis["totals"],
+                "requirements": analysis["requirements"]
+            }
+            for user_id, analysis in zip(user_ids, analyses)
+        ]
+        
+        return await self.openai_service.submit_batch_recommendations(jobs)
     
     def format_daily_summary(self, analysis: Dict) -> str:
         """
@@ -143,7 +235,7 @@ class NutritionAnalyzer:
         
         if analysis["missing_nutrients"]:
             summary += "💡 Empfehlungen:\n"
-            summary += analysis["recommendations"]
+            summary += analysis.get("recommendations", "")
         else:
             summary += "🎉 Super! Du erreichst heute alle Nährstoffziele!"
         
@@ -197,7 +289,7 @@ class NutritionAnalyzer:
         
         if analysis["missing_nutrients"]:
             summary += "💡 Empfehlungen für nächste Woche:\n"
-            summary += analysis["recommendations"]
+            summary += analysis.get("recommendations", "")
         else:
             summary += "🎉 Ausgezeichnet! Du erreichst alle wöchentlichen Nährstoffziele!"
         
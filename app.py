@@ -4,7 +4,7 @@ import tempfile
 import os
 from pathlib import Path
 from PIL import Image
-from openai_service import OpenAIService
+from openai_service import get_openai_service, run_sync
 from nutrition_db import NutritionDB
 from meal_diary import MealDiary
 from analyzer import NutritionAnalyzer
@@ -22,7 +22,7 @@ st.set_page_config(
 def get_services():
     """Initialize and cache services."""
     return {
-        'openai_service': OpenAIService(),
+        'openai_service': get_openai_service(),
         'nutrition_db': NutritionDB(),
         'meal_diary': MealDiary(),
         'analyzer': NutritionAnalyzer()
@@ -91,8 +91,10 @@ with tab1:
                     
                     try:
                         # Analyze image
-                        result = openai_service.analyze_meal_image(tmp_path)
+                        result = run_sync(openai_service.analyze_meal_image(tmp_path))
                         food_items = result["food_items"]
+                        if not food_items:
+                            raise ValueError("No foods could be identified in the photo. Please try again.")
                         
                         # Calculate nutrients
                         nutrients = nutrition_db.estimate_nutrients(food_items)
@@ -134,7 +136,7 @@ with tab2:
     st.header("📅 Today's Nutrition Summary")
     
     try:
-        analysis = analyzer.analyze_daily_intake(user_id)
+        analysis = run_sync(analyzer.analyze_daily_intake(user_id))
         summary = analyzer.format_daily_summary(analysis)
         
         # Display summary
@@ -159,7 +161,7 @@ with tab3:
     st.header("📈 Weekly Nutrition Report")
     
     try:
-        analysis = analyzer.analyze_weekly_intake(user_id)
+        analysis = run_sync(analyzer.analyze_weekly_intake(user_id))
         summary = analyzer.format_weekly_summary(analysis)
         
         # Display summary
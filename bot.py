@@ -1,16 +1,20 @@
 """Main Telegram bot for pregnancy nutrition tracking."""
+import asyncio
 import logging
 import tempfile
+import time
 import os
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict
-from telegram import Update
+from typing import AsyncIterable, List, Dict
+from telegram import Message, Update
+from telegram.error import RetryAfter
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from openai_service import OpenAIService
+from openai_service import close_shared_client, get_openai_service
 from nutrition_db import NutritionDB
 from meal_diary import MealDiary
 from analyzer import NutritionAnalyzer
+from pregnancy_profile import pregnancy_profile, LANGUAGE_INSTRUCTION
 from config import TELEGRAM_BOT_TOKEN
 
 # Enable logging
@@ -20,20 +24,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between edits while streaming a reply into a message
+STREAM_EDIT_INTERVAL = 0.5
+
+# Voice notes shorter than this (Telegram reports whole seconds) hold no speech to transcribe
+MIN_VOICE_SECONDS = 1
+
 
 class PregnancyNutritionBot:
     """Main bot class for handling Telegram interactions."""
     
     def __init__(self):
         """Initialize bot services."""
-        self.openai_service = OpenAIService()
+        self.openai_service = get_openai_service()
         self.nutrition_db = NutritionDB()
         self.meal_diary = MealDiary()
         self.analyzer = NutritionAnalyzer()
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command."""
-        from pregnancy_profile import pregnancy_profile
         week = pregnancy_profile.get_current_week()
         trimester = pregnancy_profile.get_trimester_name()
         
@@ -97,9 +106,8 @@ Fragen? Schreib mir einfach eine Nachricht!
         user_id = update.effective_user.id
         
         try:
-            analysis = self.analyzer.analyze_daily_intake(user_id)
-            summary = self.analyzer.format_daily_summary(analysis)
-            await update.message.reply_text(summary)
+            analysis = await self.analyzer.analyze_daily_intake(user_id, with_recommendations=False)
+            await self._reply_with_summary(update.message, analysis, self.analyzer.format_daily_summary(analysis))
         except Exception as e:
             logger.error(f"Error getting diary: {e}")
             await update.message.reply_text(
@@ -111,9 +119,8 @@ Fragen? Schreib mir einfach eine Nachricht!
         user_id = update.effective_user.id
         
         try:
-            analysis = self.analyzer.analyze_weekly_intake(user_id)
-            summary = self.analyzer.format_weekly_summary(analysis)
-            await update.message.reply_text(summary)
+            analysis = await self.analyzer.analyze_weekly_intake(user_id, with_recommendations=False)
+            await self._reply_with_summary(update.message, analysis, self.analyzer.format_weekly_summary(analysis))
         except Exception as e:
             logger.error(f"Error getting weekly report: {e}")
             await update.message.reply_text(
@@ -127,17 +134,16 @@ Fragen? Schreib mir einfach eine Nachricht!
         text = update.message.text
         
         # Let LLM classify user intent instead of rigid keyword matching
-        intent = self.openai_service.classify_user_intent(text)
+        intent = await self.openai_service.classify_user_intent(text)
         logger.info(f"User intent classified as: {intent} for message: {text[:50]}...")
         
         if intent == "question":
             # Answer questions with context from nutrition diary
             try:
                 response = await update.message.reply_text("💭 Einen Moment...")
-                answer = self.openai_service.answer_nutrition_question(
+                await self._stream_reply(response, self.openai_service.stream_nutrition_answer(
                     text, user_id, self.meal_diary, self.analyzer
-                )
-                await response.edit_text(answer)
+                ))
             except Exception as e:
                 logger.error(f"Error answering question: {e}", exc_info=True)
                 await update.message.reply_text(
@@ -155,7 +161,7 @@ Fragen? Schreib mir einfach eine Nachricht!
                 meal_timestamp = self.openai_service.parse_time_context(text)
                 
                 # Parse meal description - ask LLM for nutrients too
-                result = self.openai_service.parse_meal_description_with_nutrients(text)
+                result = await self.openai_service.parse_meal_description_with_nutrients(text)
                 food_items = result["food_items"]
                 
                 if not food_items:
@@ -201,12 +207,11 @@ Fragen? Schreib mir einfach eine Nachricht!
         else:
             # General conversation - use AI to respond
             try:
-                from pregnancy_profile import pregnancy_profile, LANGUAGE_INSTRUCTION
                 profile_context = pregnancy_profile.get_context_string()
                 
                 # Get context about user's nutrition
                 try:
-                    daily_analysis = self.analyzer.analyze_daily_intake(user_id)
+                    daily_analysis = await self.analyzer.analyze_daily_intake(user_id, with_recommendations=False)
                     nutrition_context = f"Die Nutzerin hat heute {daily_analysis['meal_count']} Mahlzeiten eingetragen."
                 except:
                     nutrition_context = "Die Nutzerin fängt gerade erst an."
@@ -232,24 +237,11 @@ Antworte natürlich und hilfreich auf Deutsch. Wenn sie fragt was du kannst, erk
 
 Halte es gesprächig, ermutigend und unterstützend. Sei kurz (2-3 Sätze max)."""
 
-                ai_response = self.openai_service.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"Du bist eine freundliche, unterstützende Ernährungsberaterin für Schwangerschaft. {LANGUAGE_INSTRUCTION} Du kennst alle Informationen über diese Nutzerin - beantworte Fragen direkt!"
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    max_tokens=200,
-                    temperature=0.7
-                )
-                
-                response = ai_response.choices[0].message.content
-                await update.message.reply_text(response)
+                reply = await update.message.reply_text("💭 Einen Moment...")
+                await self._stream_reply(reply, self.openai_service.stream_chat_reply(
+                    f"Du bist eine freundliche, unterstützende Ernährungsberaterin für Schwangerschaft. {LANGUAGE_INSTRUCTION} Du kennst alle Informationen über diese Nutzerin - beantworte Fragen direkt!",
+                    prompt
+                ))
                 
             except Exception as e:
                 logger.error(f"Error in conversational response: {e}", exc_info=True)
@@ -290,9 +282,15 @@ Halte es gesprächig, ermutigend und unterstützend. Sei kurz (2-3 Sätze max)."
             
             try:
                 # Analyze image - LLM provides nutrients directly
-                result = self.openai_service.analyze_meal_image(tmp_path)
+                result = await self.openai_service.analyze_meal_image(tmp_path)
                 food_items = result["food_items"]
                 
+                if not food_items:
+                    await processing_msg.edit_text(
+                        "❌ Ich konnte auf dem Foto keine Lebensmittel erkennen. Bitte versuch es noch einmal."
+                    )
+                    return
+                
                 # Aggregate nutrients from all food items (LLM provides nutrients per item)
                 nutrients = self._aggregate_nutrients_from_items(food_items)
                 
@@ -345,6 +343,12 @@ Halte es gesprächig, ermutigend und unterstützend. Sei kurz (2-3 Sätze max)."
         try:
             # Get the voice file
             voice = update.message.voice
+            if voice.duration < MIN_VOICE_SECONDS:
+                # Nothing to transcribe; skip the download and the Whisper call
+                await processing_msg.edit_text(
+                    "🔇 Deine Sprachnachricht war zu kurz. Bitte sprich etwas länger."
+                )
+                return
             file = await context.bot.get_file(voice.file_id)
             
             # Download voice to temporary file
@@ -354,26 +358,30 @@ Halte es gesprächig, ermutigend und unterstützend. Sei kurz (2-3 Sätze max)."
             
             try:
                 # Transcribe voice
-                transcribed_text = self.openai_service.transcribe_voice(str(tmp_path))
+                transcribed_text = await self.openai_service.transcribe_voice(str(tmp_path))
+                if not transcribed_text:
+                    await processing_msg.edit_text(
+                        "🔇 Ich konnte in deiner Sprachnachricht nichts verstehen. Bitte versuch es noch einmal."
+                    )
+                    return
                 
                 # Update processing message
                 await processing_msg.edit_text(f"📝 Du hast gesagt: \"{transcribed_text}\"\n\nIch verarbeite das...")
                 
                 # Use LLM to classify intent
-                intent = self.openai_service.classify_user_intent(transcribed_text)
+                intent = await self.openai_service.classify_user_intent(transcribed_text)
                 logger.info(f"Voice intent classified as: {intent}")
                 
                 if intent == "question":
                     # Answer question with nutrition context
-                    answer = self.openai_service.answer_nutrition_question(
+                    await self._stream_reply(processing_msg, self.openai_service.stream_nutrition_answer(
                         transcribed_text, user_id, self.meal_diary, self.analyzer
-                    )
-                    await processing_msg.edit_text(answer)
+                    ))
                 
                 elif intent == "meal_log":
                     # Parse meal description and log it - LLM provides nutrients
                     meal_timestamp = self.openai_service.parse_time_context(transcribed_text)
-                    result = self.openai_service.parse_meal_description_with_nutrients(transcribed_text)
+                    result = await self.openai_service.parse_meal_description_with_nutrients(transcribed_text)
                     food_items = result["food_items"]
                     
                     if not food_items:
@@ -413,7 +421,6 @@ Halte es gesprächig, ermutigend und unterstützend. Sei kurz (2-3 Sätze max)."
                 else:
                     # General conversation - respond conversationally
                     try:
-                        from pregnancy_profile import pregnancy_profile, LANGUAGE_INSTRUCTION
                         profile_context = pregnancy_profile.get_context_string()
                         
                         prompt = f"""Du bist eine freundliche, unterstützende Ernährungsberaterin für Schwangere.
@@ -428,24 +435,10 @@ Sie hat dir gerade eine Sprachnachricht geschickt: "{transcribed_text}"
 
 Antworte natürlich und hilfreich auf Deutsch. Falls unklar, stelle Rückfragen. Kurz halten (2-3 Sätze)."""
 
-                        ai_response = self.openai_service.client.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[
-                                {
-                                    "role": "system",
-                                    "content": f"Du bist eine freundliche, unterstützende Ernährungsberaterin für Schwangerschaft. {LANGUAGE_INSTRUCTION}"
-                                },
-                                {
-                                    "role": "user",
-                                    "content": prompt
-                                }
-                            ],
-                            max_tokens=200,
-                            temperature=0.7
-                        )
-                        
-                        response = ai_response.choices[0].message.content
-                        await processing_msg.edit_text(response)
+                        await self._stream_reply(processing_msg, self.openai_service.stream_chat_reply(
+                            f"Du bist eine freundliche, unterstützende Ernährungsberaterin für Schwangerschaft. {LANGUAGE_INSTRUCTION}",
+                            prompt
+                        ))
                     except:
                         await processing_msg.edit_text(
                             "Ich hab dich gehört! Erzähl mir mehr über was du Hilfe brauchst - "
@@ -463,9 +456,61 @@ Antworte natürlich und hilfreich auf Deutsch. Falls unklar, stelle Rückfragen.
                 "❌ Entschuldigung, ich konnte deine Sprachnachricht nicht verarbeiten. Versuch es nochmal oder schreib mir eine Textnachricht."
             )
     
+    async def _reply_with_summary(self, message: Message, analysis: Dict, summary: str):
+        """
+        Send a nutrition summary right away and stream its recommendations into it.
+        
+        Args:
+            message: User message to reply to
+            analysis: Analysis computed without recommendations
+            summary: Formatted summary, ending in the recommendations heading if any are due
+        """
+        reply = await message.reply_text(summary)
+        if analysis["missing_nutrients"]:
+            await self._stream_reply(reply, self.openai_service.stream_recommendations(
+                analysis["missing_nutrients"], analysis["totals"], analysis["requirements"]
+            ), prefix=summary)
+    
+    async def _stream_reply(self, message: Message, chunks: AsyncIterable[str], prefix: str = "") -> str:
+        """
+        Show streamed text in a message, editing it as chunks arrive.
+        
+        Edits are throttled to STREAM_EDIT_INTERVAL; the final edit always
+        carries the complete text.
+        
+        Args:
+            message: Bot message to edit
+            chunks: Text chunks from a streaming completion
+            prefix: Text shown above the streamed chunks
+        
+        Returns:
+            The complete text
+        """
+        text = prefix
+        shown = prefix
+        last_edit = time.monotonic()
+        async for chunk in chunks:
+            text += chunk
+            if time.monotonic() - last_edit >= STREAM_EDIT_INTERVAL and text.strip():
+                try:
+                    await message.edit_text(text)
+                    shown = text
+                except RetryAfter:
+                    # Skip this update, a later edit carries the text
+                    pass
+                last_edit = time.monotonic()
+        
+        if text != shown:
+            try:
+                await message.edit_text(text)
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                await message.edit_text(text)
+        return text
+    
     def _aggregate_nutrients_from_items(self, food_items: List[Dict]) -> Dict[str, float]:
         """
-        Aggregate nutrients from food items that already contain nutrition data from LLM.
+        Aggregate nutrients from food items, grounding known foods in the knowledge base.
         
         Args:
             food_items: List of food items, each potentially containing 'nutrients' dict
@@ -491,7 +536,15 @@ Antworte natürlich und hilfreich auf Deutsch. Falls unklar, stelle Rückfragen.
         }
         
         for item in food_items:
-            # If item has nutrients directly from LLM, use them
+            # Prefer reference values for foods the knowledge base knows exactly.
+            # Entries only list some nutrients, so the LLM estimate fills the
+            # rest; the item is updated so stored items and totals agree.
+            reference = self.nutrition_db.lookup_nutrients(
+                item.get("name", ""), item.get("quantity", 100)
+            )
+            if reference is not None:
+                item["nutrients"] = {**(item.get("nutrients") or {}), **reference}
+            # If item has nutrients (LLM estimate, grounded where known), use them
             if "nutrients" in item and item["nutrients"]:
                 for nutrient, value in item["nutrients"].items():
                     if nutrient in total_nutrients:
@@ -505,10 +558,19 @@ Antworte natürlich und hilfreich auf Deutsch. Falls unklar, stelle Rückfragen.
         
         return total_nutrients
     
+    async def _post_shutdown(self, application: Application):
+        """Release the shared OpenAI connection pool when the bot stops."""
+        await close_shared_client()
+    
     def run(self):
         """Start the bot."""
         # Create application
-        application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+        application = (
+            Application.builder()
+            .token(TELEGRAM_BOT_TOKEN)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         
         # Register handlers
         application.add_handler(CommandHandler("start", self.start_command))
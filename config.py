@@ -25,3 +25,12 @@ DATABASE_PATH = DATA_DIR / "meals.db"
 # Nutrition Knowledge Base
 NUTRITION_BASE_PATH = DATA_DIR / "nutrition_base.json"
 
+# OpenAI request pacing. Failed calls (429, 5xx, timeouts) are retried by the
+# SDK with exponential backoff that honours Retry-After headers.
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+
+# Vision detail for meal photos: "low" (flat 85 tokens, 512px view) is enough
+# to recognise dishes; "high" or "auto" for finer portion estimates
+OPENAI_IMAGE_DETAIL = os.getenv("OPENAI_IMAGE_DETAIL", "low")
@@ -3,6 +3,7 @@ import os
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+from nutrition_db import NUTRIENT_KEYS
 
 # Check if we have a PostgreSQL DATABASE_URL (Railway), otherwise use SQLite
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -219,44 +220,68 @@ class MealDiary:
         
         return meals
     
-    def get_daily_totals(self, user_id: int, date: Optional[datetime] = None) -> Dict[str, float]:
+    def get_last_meal_id(self, user_id: int) -> int:
         """
-        Calculate total nutrients consumed in a day.
+        Get the ID of the user's most recently added meal.
+        
+        Meals are only ever appended, so this works as a cheap version number
+        for the user's diary: it changes exactly when a meal is added.
         
         Args:
             user_id: Telegram user ID
-            date: Date to query (defaults to today)
+        
+        Returns:
+            Highest meal ID of the user (0 if the diary is empty)
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        if self.use_postgres:
+            cursor.execute("SELECT MAX(id) FROM meals WHERE user_id = %s", (user_id,))
+        else:
+            cursor.execute("SELECT MAX(id) FROM meals WHERE user_id = ?", (user_id,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row[0] or 0
+    
+    @staticmethod
+    def sum_nutrients(meals: List[Dict]) -> Dict[str, float]:
+        """
+        Add up the nutrients of already loaded meals.
+        
+        Lets callers that need both the meals and their totals read the
+        diary once instead of querying it again via get_*_totals.
+        
+        Args:
+            meals: Meal dictionaries from get_daily_meals / get_weekly_meals
         
         Returns:
             Dictionary of total nutrient values
         """
-        meals = self.get_daily_meals(user_id, date)
-        
-        totals = {
-            "calories": 0,
-            "protein_g": 0,
-            "carbohydrates_g": 0,
-            "fiber_g": 0,
-            "fat_g": 0,
-            "folate_mcg": 0,
-            "iron_mg": 0,
-            "calcium_mg": 0,
-            "vitamin_d_iu": 0,
-            "vitamin_c_mg": 0,
-            "vitamin_a_mcg": 0,
-            "vitamin_b12_mcg": 0,
-            "zinc_mg": 0,
-            "omega3_g": 0
-        }
+        totals = dict.fromkeys(NUTRIENT_KEYS, 0)
         
         for meal in meals:
-            nutrients = meal["nutrients"]
-            for nutrient, value in nutrients.items():
+            for nutrient, value in meal["nutrients"].items():
                 if nutrient in totals:
                     totals[nutrient] += value
         
         return totals
     
+    def get_daily_totals(self, user_id: int, date: Optional[datetime] = None) -> Dict[str, float]:
+        """
+        Calculate total nutrients consumed in a day.
+        
+        Args:
+            user_id: Telegram user ID
+            date: Date to query (defaults to today)
+        
+        Returns:
+            Dictionary of total nutrient values
+        """
+        return self.sum_nutrients(self.get_daily_meals(user_id, date))
+    
     def get_weekly_totals(self, user_id: int, end_date: Optional[datetime] = None) -> Dict[str, float]:
         """
         Calculate total nutrients consumed in the past week.
@@ -268,30 +293,5 @@ class MealDiary:
         Returns:
             Dictionary of total nutrient values
         """
-        meals = self.get_weekly_meals(user_id, end_date)
-        
-        totals = {
-            "calories": 0,
-            "protein_g": 0,
-            "carbohydrates_g": 0,
-            "fiber_g": 0,
-            "fat_g": 0,
-            "folate_mcg": 0,
-            "iron_mg": 0,
-            "calcium_mg": 0,
-            "vitamin_d_iu": 0,
-            "vitamin_c_mg": 0,
-            "vitamin_a_mcg": 0,
-            "vitamin_b12_mcg": 0,
-            "zinc_mg": 0,
-            "omega3_g": 0
-        }
-        
-        for meal in meals:
-            nutrients = meal["nutrients"]
-            for nutrient, value in nutrients.items():
-                if nutrient in totals:
-                    totals[nutrient] += value
-        
-        return totals
+        return self.sum_nutrients(self.get_weekly_meals(user_id, end_date))
 
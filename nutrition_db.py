@@ -1,10 +1,90 @@
 """Nutrition knowledge base and calculations for pregnancy nutrition."""
 import json
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple, Optional
 from config import NUTRITION_BASE_PATH
 
 
+class NutrientTotals(NamedTuple):
+    """Fixed-schema nutrient amounts; nutrients not given default to 0."""
+    calories: float = 0
+    protein_g: float = 0
+    carbohydrates_g: float = 0
+    fiber_g: float = 0
+    fat_g: float = 0
+    folate_mcg: float = 0
+    iron_mg: float = 0
+    calcium_mg: float = 0
+    vitamin_d_iu: float = 0
+    vitamin_c_mg: float = 0
+    vitamin_a_mcg: float = 0
+    vitamin_b12_mcg: float = 0
+    zinc_mg: float = 0
+    omega3_g: float = 0
+    
+    @classmethod
+    def from_dict(cls, values: Dict[str, float]) -> "NutrientTotals":
+        """Build from a nutrient dictionary, ignoring keys outside the schema."""
+        return cls(*[values.get(key, 0) for key in cls._fields])
+
+
+# Canonical nutrient keys tracked per meal, in display order
+NUTRIENT_KEYS = NutrientTotals._fields
+
+# Food name keywords mapped to knowledge base entries
+_FOOD_KEYWORDS = {
+    "chicken": "chicken_breast_100g",
+    "salmon": "salmon_100g",
+    "fish": "salmon_100g",
+    "spinach": "spinach_100g",
+    "broccoli": "broccoli_100g",
+    "egg": "eggs_100g",
+    "milk": "milk_100ml",
+    "yogurt": "yogurt_100g",
+    "bread": "whole_grain_bread_100g",
+    "rice": "brown_rice_100g_cooked",
+    "lentil": "lentils_100g_cooked",
+    "avocado": "avocado_100g",
+    "banana": "banana_100g",
+    "orange": "orange_100g",
+    "almond": "almonds_100g",
+    "cheese": "cheese_100g",
+    "steak": "beef_steak_100g",
+    "beef": "beef_100g",
+    "asparagus": "asparagus_100g",
+    "tomato": "tomatoes_100g",
+    "tomatoes": "tomatoes_100g",
+    "cherry tomato": "cherry_tomatoes_100g",
+    "cherry tomatoes": "cherry_tomatoes_100g",
+    "pork": "pork_100g",
+    "turkey": "turkey_100g",
+    "carrot": "carrots_100g",
+    "carrots": "carrots_100g",
+    "potato": "potatoes_100g",
+    "potatoes": "potatoes_100g",
+    "pasta": "pasta_100g_cooked",
+    "quinoa": "quinoa_100g_cooked",
+    "sweet potato": "sweet_potato_100g",
+    "sweet potatoes": "sweet_potato_100g",
+    "bell pepper": "bell_pepper_100g",
+    "pepper": "bell_pepper_100g",
+    "cucumber": "cucumber_100g",
+    "zucchini": "zucchini_100g"
+}
+
+
+def _normalize_food_name(name: str) -> str:
+    """Lowercase a food name and collapse underscores/whitespace to single spaces."""
+    return " ".join(name.lower().replace("_", " ").split())
+
+
+def _singular(name: str) -> str:
+    """Crudely strip an English plural ending ("tomatoes" -> "tomato", "eggs" -> "egg")."""
+    if name.endswith("oes"):
+        return name[:-2]
+    return name[:-1] if name.endswith("s") else name
+
+
 class NutritionDB:
     """Manages pregnancy nutrition requirements and food-to-nutrient mapping."""
     
@@ -13,6 +93,7 @@ class NutritionDB:
         self.nutrition_base = self._load_nutrition_base()
         self.requirements = self.nutrition_base["pregnancy_requirements"]
         self.food_nutrients = self.nutrition_base["food_nutrients"]
+        self._exact_food_index = self._build_exact_food_index()
     
     def _load_nutrition_base(self) -> Dict:
         """Load nutrition base from JSON file."""
@@ -22,6 +103,45 @@ class NutritionDB:
         with open(NUTRITION_BASE_PATH, 'r') as f:
             return json.load(f)
     
+    def _build_exact_food_index(self) -> Dict[str, str]:
+        """Map normalized food names (and their plural forms) to knowledge base keys."""
+        index = {}
+        for key in self.food_nutrients:
+            key_base = key.replace("_100g", "").replace("_100ml", "").replace("_cooked", "")
+            index[_normalize_food_name(key_base)] = key
+        # Only singular/plural spellings; generic keywords like "fish" or
+        # "pepper" are too vague to trust over the LLM's own estimate
+        for keyword, key in _FOOD_KEYWORDS.items():
+            key_base = key.replace("_100g", "").replace("_100ml", "").replace("_cooked", "")
+            if _singular(keyword) == _singular(_normalize_food_name(key_base)):
+                index.setdefault(keyword, key)
+        return index
+    
+    def lookup_nutrients(self, food_name: str, quantity: float = 100) -> Optional[Dict[str, float]]:
+        """
+        Look up reference nutrients for a food whose name matches the knowledge base exactly.
+        
+        Unlike estimate_nutrients, no fuzzy matching is done, so "chicken soup"
+        is not mistaken for chicken breast.
+        
+        Args:
+            food_name: Name of the food item
+            quantity: Amount in grams (or ml for drinks)
+        
+        Returns:
+            Nutrient values scaled to the quantity, or None if the food is unknown
+        """
+        food_key = self._exact_food_index.get(_normalize_food_name(food_name))
+        if food_key is None:
+            return None
+        
+        multiplier = quantity / 100.0
+        return {
+            nutrient: value * multiplier
+            for nutrient, value in self.food_nutrients[food_key].items()
+            if nutrient in NUTRIENT_KEYS
+        }
+    
     def get_daily_requirements(self) -> Dict[str, float]:
         """Get daily nutritional requirements for pregnancy."""
         return self.requirements["daily"].copy()
@@ -91,49 +211,9 @@ class NutritionDB:
             if key_base in food_name_lower or food_name_lower in key_base:
                 return key
         
-        # Keyword matching - expanded list
-        keywords = {
-            "chicken": "chicken_breast_100g",
-            "salmon": "salmon_100g",
-            "fish": "salmon_100g",
-            "spinach": "spinach_100g",
-            "broccoli": "broccoli_100g",
-            "egg": "eggs_100g",
-            "milk": "milk_100ml",
-            "yogurt": "yogurt_100g",
-            "bread": "whole_grain_bread_100g",
-            "rice": "brown_rice_100g_cooked",
-            "lentil": "lentils_100g_cooked",
-            "avocado": "avocado_100g",
-            "banana": "banana_100g",
-            "orange": "orange_100g",
-            "almond": "almonds_100g",
-            "cheese": "cheese_100g",
-            "steak": "beef_steak_100g",
-            "beef": "beef_100g",
-            "asparagus": "asparagus_100g",
-            "tomato": "tomatoes_100g",
-            "tomatoes": "tomatoes_100g",
-            "cherry tomato": "cherry_tomatoes_100g",
-            "cherry tomatoes": "cherry_tomatoes_100g",
-            "pork": "pork_100g",
-            "turkey": "turkey_100g",
-            "carrot": "carrots_100g",
-            "carrots": "carrots_100g",
-            "potato": "potatoes_100g",
-            "potatoes": "potatoes_100g",
-            "pasta": "pasta_100g_cooked",
-            "quinoa": "quinoa_100g_cooked",
-            "sweet potato": "sweet_potato_100g",
-            "sweet potatoes": "sweet_potato_100g",
-            "bell pepper": "bell_pepper_100g",
-            "pepper": "bell_pepper_100g",
-            "cucumber": "cucumber_100g",
-            "zucchini": "zucchini_100g"
-        }
         
         # Try keyword matching (check if any keyword appears in food name)
-        for keyword, key in keywords.items():
+        for keyword, key in _FOOD_KEYWORDS.items():
             if keyword in food_name_lower:
                 return key
         
@@ -1,21 +1,537 @@
 """OpenAI API integration for image analysis and recommendations."""
+import asyncio
 import base64
-from typing import Dict, List, Optional
-from openai import OpenAI
-from config import OPENAI_API_KEY
-from datetime import datetime, timedelta
+import copy
+import functools
+import io
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import AsyncIterator, Awaitable, BinaryIO, Dict, List, Optional, Tuple, TypeVar, Union
+import httpx
+from openai import AsyncOpenAI
+from PIL import Image, ImageOps, UnidentifiedImageError
+from config import (
+    OPENAI_API_KEY, OPENAI_IMAGE_DETAIL, OPENAI_MAX_RETRIES,
+    OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE
+)
+from rate_limiter import SlidingWindowRateLimiter
+from response_cache import ResponseCache, content_key
+from nutrition_db import NUTRIENT_KEYS, NutrientTotals
+from datetime import date, datetime, timedelta
 import re
 from pregnancy_profile import pregnancy_profile, LANGUAGE, LANGUAGE_INSTRUCTION
 
+logger = logging.getLogger(__name__)
+
+# One HTTP/2 connection pool and OpenAI client shared by every OpenAIService,
+# so TLS handshakes are paid once per process instead of once per instance.
+# Idle connections are kept for a minute (httpx default: 5s) so the gaps
+# between a user's messages do not cost a new handshake.
+_http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60.0),
+    timeout=httpx.Timeout(60.0, connect=5.0)
+)
+# The SDK retries 429/5xx/timeouts with jittered exponential backoff and
+# honours Retry-After; the limiter keeps bursts from hitting 429 at all.
+_openai_client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=_http_client,
+    max_retries=OPENAI_MAX_RETRIES
+)
+_rate_limiter = SlidingWindowRateLimiter(
+    OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE
+)
+
+# Rough token cost of one image input, used only for client-side pacing.
+# "low" detail is billed a flat 85 tokens; otherwise a 1024px image is ~765.
+_IMAGE_TOKEN_ESTIMATE = 85 if OPENAI_IMAGE_DETAIL == "low" else 765
+
+# Bulk recommendation runs keep about as many requests in flight as the
+# request limit sustains at a few seconds per completion, capped so one run
+# cannot monopolize the connection pool
+_BULK_REQUEST_SECONDS = 5
+_MAX_BULK_CONCURRENCY = 32
+
+# Photos are shrunk to fit this box before upload; the vision model tiles
+# larger images at 512px anyway, so extra pixels only add input tokens.
+# At "low" detail it only ever looks at a 512px version.
+_MAX_IMAGE_SIDE = 512 if OPENAI_IMAGE_DETAIL == "low" else 1024
+_DOWNSCALED_JPEG_QUALITY = 85
+# Formats the API accepts as-is when the image is already small enough
+_UPLOADABLE_IMAGE_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+
+# Bytes read per base64 chunk; a multiple of 3 so chunks encode without padding
+_B64_CHUNK_SIZE = 3 * 64 * 1024
+
+# Background event loop that runs coroutines for synchronous callers (Streamlit)
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+T = TypeVar("T")
+
+# Static prompt text is kept at module level so every request starts with a
+# byte-identical prefix. OpenAI caches repeated prompt prefixes server-side,
+# so variable data (totals, questions, meal text) always goes at the end.
+_INTENT_SYSTEM = """Classify the user's intent into exactly ONE of these categories:
+- meal_log: User is TELLING you about a meal they want to LOG (stating what they ate/are eating as a fact to record)
+- question: User is ASKING something - a question about nutrition, what they've eaten, recommendations, pregnancy, or anything else
+- greeting: User is greeting, saying hello, or casual chat
+
+IMPORTANT distinctions:
+- "Ich hatte Hähnchen zum Mittag" = meal_log (stating a meal to record)
+- "Was habe ich heute gegessen?" = question (asking about past meals)
+- "Wie ist meine Ernährung?" = question (asking for evaluation)
+- "Zum Frühstück gab es Müsli" = meal_log (reporting breakfast)
+- "Welche Nährstoffe fehlen mir?" = question (asking about nutrients)
+
+Respond with ONLY the category name, nothing else."""
+
+_NUTRITION_JSON_FORMAT = "Nutrient values are for the whole portion (quantity_g), not per 100 g. Use 0 for nutrients the food does not contain."
+
+# Meal photos are identified and priced in a single vision call
+_SYSTEM_MEAL_VISION = """You are a nutrition expert. Identify the foods in the image, estimate each portion in grams and return ONLY valid JSON with their nutrition data.
+""" + _NUTRITION_JSON_FORMAT
+
+_USER_MEAL_INSTRUCTIONS = "What foods do you see in this meal? Include every food with its estimated quantity and full nutritional values. Be specific about the food type (e.g., 'grilled beef steak' not just 'meat')."
+
+_SYSTEM_NUTRITION_DB = """You are a nutrition database. Return ONLY valid JSON with nutrition data.
+""" + _NUTRITION_JSON_FORMAT
+
+_SYSTEM_NUTRITIONIST = f"You are a friendly, supportive nutritionist specializing in pregnancy nutrition. {LANGUAGE_INSTRUCTION} Provide practical, encouraging advice."
+
+_RECOMMENDATION_INSTRUCTIONS = f"""You are a nutritionist helping a pregnant woman optimize her diet.
+
+{LANGUAGE_INSTRUCTION}
+
+Provide 2-3 specific, practical meal or snack suggestions that would help address the missing nutrients listed below, considering her current trimester. Be encouraging and pregnancy-appropriate. Keep it concise (2-3 sentences per suggestion)."""
+
+# Built once; filled per call with NutrientTotals for "totals" and "req"
+_RECOMMENDATION_TEMPLATE = _RECOMMENDATION_INSTRUCTIONS + """
+
+{profile_context}
+
+{trimester_focus}
+
+Current daily intake:
+- Calories: {totals.calories:.0f} / {req.calories:.0f}
+- Protein: {totals.protein_g:.1f}g / {req.protein_g:.1f}g
+- Iron: {totals.iron_mg:.1f}mg / {req.iron_mg:.1f}mg
+- Folate: {totals.folate_mcg:.1f}mcg / {req.folate_mcg:.1f}mcg
+- Calcium: {totals.calcium_mg:.1f}mg / {req.calcium_mg:.1f}mg
+
+Nutrients that need attention:
+{missing_text}"""
+
+# Returned without an API call when no nutrient is below target
+_ON_TRACK_RECOMMENDATION = "Du erreichst alle Nährstoffziele - weiter so! 🎉"
+
+# All instructions live in the system message, followed by the pregnancy
+# profile; that prefix is identical for every question on the same day, so
+# OpenAI's prompt cache can reuse it. The user message carries the diary.
+_QA_SYSTEM = f"""Du bist eine freundliche, unterstützende Ernährungsberaterin für eine schwangere Frau. {LANGUAGE_INSTRUCTION}
+Du hast VOLLSTÄNDIGEN Zugriff auf ihr Schwangerschaftsprofil (unten) und ihr Ernährungstagebuch (in ihrer Nachricht). Beantworte Fragen DIREKT mit diesen Daten - frag nie nach Infos die du schon hast!
+Fragt sie nach Mahlzeiten, liste sie auf. Fragt sie nach Nährstoffen, sei konkret. Antworte ermutigend, gesprächig und spezifisch."""
+
+# Built once; filled per call with NutrientTotals for the day/week values
+_QA_NUTRITION_TEMPLATE = """{daily_meals_text}
+{weekly_meals_text}
+
+NÄHRSTOFF-ÜBERSICHT HEUTE:
+- Kalorien: {day.calories:.0f} / {day_req.calories:.0f} kcal
+- Protein: {day.protein_g:.1f}g / {day_req.protein_g:.1f}g
+- Eisen: {day.iron_mg:.1f}mg / {day_req.iron_mg:.1f}mg
+- Folsäure: {day.folate_mcg:.1f}mcg / {day_req.folate_mcg:.1f}mcg
+- Kalzium: {day.calcium_mg:.1f}mg / {day_req.calcium_mg:.1f}mg
+
+Fehlende Nährstoffe heute: {missing_text}
+
+NÄHRSTOFF-ÜBERSICHT WOCHE:
+- Kalorien: {week.calories:.0f} / {week_req.calories:.0f} kcal
+- Protein: {week.protein_g:.1f}g / {week_req.protein_g:.1f}g
+- Eisen: {week.iron_mg:.1f}mg / {week_req.iron_mg:.1f}mg
+"""
+
+# Diary context first, the user's question last
+_QA_PROMPT_TEMPLATE = """{nutrition_context}
+
+Frage der Nutzerin: "{question}\""""
+
+# Questions about nutrients, supplements or advice get the trimester focus
+# text; diary lookups ("Was habe ich heute gegessen?") do not need it
+_FOCUS_TOPIC_RE = re.compile(
+    r'nährstoff|naehrstoff|vitamin|mineral|eisen|kalzium|calcium|folsäure|folat|jod|zink|omega|'
+    r'protein|eiweiß|eiweiss|ballaststoff|supplement|orthomol|trimester|fehl|brauch|mangel|'
+    r'empfehl|tipp|sollte|soll ich|übelkeit|uebelkeit|nutrient|should|recommend',
+    re.IGNORECASE
+)
+
+# Readable nutrient names for prompts, e.g. "vitamin_b12_mcg" -> "Vitamin B12 Mcg"
+_PRETTY_NAMES = {key: key.replace("_", " ").title() for key in NUTRIENT_KEYS}
+
+# Time context keywords (English + German) mapped to a day or meal tag.
+# Longer keywords are tried first so "vorgestern" is not read as "gestern".
+_TIME_KEYWORDS = {
+    "today": "today", "this": "today", "heute": "today", "jetzt": "today", "gerade": "today",
+    "yesterday": "yesterday", "gestern": "yesterday",
+    "vorgestern": "day_before_yesterday",
+    "breakfast": "breakfast", "frühstück": "breakfast", "fruehstueck": "breakfast",
+    "lunch": "lunch", "mittagessen": "lunch", "mittag": "lunch",
+    "dinner": "dinner", "supper": "dinner", "abendessen": "dinner", "abend": "dinner",
+    "snack": "snack", "zwischenmahlzeit": "snack", "snacks": "snack",
+}
+_TIME_KEYWORD_RE = re.compile(
+    "|".join(re.escape(keyword) for keyword in sorted(_TIME_KEYWORDS, key=len, reverse=True))
+)
+_DAYS_AGO_RE = re.compile(r'(\d+)\s+days?\s+ago')
+_VOR_TAGEN_RE = re.compile(r'vor\s+(\d+)\s+tag')
+_MEAL_PRIORITY = ("breakfast", "lunch", "dinner", "snack")
+_MEAL_TIMES = {
+    "breakfast": timedelta(hours=8),
+    "lunch": timedelta(hours=13),
+    "dinner": timedelta(hours=19),
+    "snack": timedelta(hours=15),
+}
+_DEFAULT_MEAL_TIME = timedelta(hours=12)
+
+# Small talk that reaches the Q&A path is answered without an API call
+_SMALL_TALK_RE = re.compile(
+    r'^\W*(?:(?P<greeting>hi|hallo|hello|hey|moin|servus|guten (?:morgen|tag|abend))'
+    r'|(?P<thanks>danke(?: schön| sehr)?|dankeschön|vielen dank|thanks|thank you)'
+    r'|(?P<bye>bye|tschüss|ciao|bis bald))\W*$',
+    re.IGNORECASE
+)
+_SMALL_TALK_REPLIES = {
+    "greeting": "Hallo! 👋 Frag mich gern etwas zu deiner Ernährung oder schick mir ein Foto deiner Mahlzeit.",
+    "thanks": "Sehr gern! 💚 Melde dich, wenn du noch Fragen hast.",
+    "bye": "Bis bald! 👋 Lass es dir schmecken.",
+}
+# Questions about the pregnancy dates themselves are answered from the profile.
+# Only whole-message matches count, so "Was brauche ich diese Woche?" still
+# goes to the model.
+_PROFILE_QUESTION_RE = re.compile(
+    r'^\W*(?:(?P<week>(?:in )?welcher? (?:schwangerschafts)?woche bin ich(?: gerade| jetzt)?'
+    r'|welche ssw (?:habe|bin) ich|wie weit bin ich|(?:what|which) week am i(?: in)?|how far along am i)'
+    r'|(?P<trimester>in welchem trimester bin ich(?: gerade| jetzt)?|(?:what|which) trimester am i in)'
+    r'|(?P<due_date>wann ist (?:mein|der) (?:errechneter? )?(?:geburts)?termin|wann kommt (?:mein|das) baby'
+    r'|(?:when|what) is my due date))\W*$',
+    re.IGNORECASE
+)
+_TRIMESTER_ORDINALS_DE = ("ersten", "zweiten", "dritten")
+# Messages whose intent is clear from their wording skip the LLM classifier.
+# Meal logging needs an explicit eating verb, no negation ("noch nichts
+# gegessen") and no question wording, since a wrong meal_log writes to the
+# diary. A question word only counts when the message ends with "?" or
+# mentions no food ("Was für ein leckeres Frühstück: Müsli mit Beeren" is a
+# meal); anything ambiguous still goes to the model.
+_MEAL_LOG_RE = re.compile(
+    r"\b(?:gegessen|getrunken|gefrühstückt|gefruehstueckt|aß|i ate|i've eaten|i have eaten)\b",
+    re.IGNORECASE
+)
+# Anything that hints at a food report: eating verbs, meals, portion sizes
+_FOOD_LOG_CUE_RE = re.compile(
+    r"\b(?:gegessen|getrunken|gefrühstückt|gefruehstueckt|aß|hatte|ate|eaten|had|"
+    r"frühstück|fruehstueck|mittagessen|abendessen|snack|breakfast|lunch|dinner)\b"
+    r"|\d+\s*(?:g|kg|ml|l|stück|scheiben?|portionen|portion|glas|gläser|tassen?)\b",
+    re.IGNORECASE
+)
+_NEGATION_RE = re.compile(r'\b(?:nicht|nichts|kein|keine|keinen|keinem|nie|not|nothing|no)\b', re.IGNORECASE)
+_QUESTION_START_RE = re.compile(
+    r'^\W*(?:was|wie|welche[rsmn]?|wieviel|warum|wieso|weshalb|wann|wo|woran|womit|kann|darf|'
+    r'soll|sollte|muss|ist|sind|gibt|hilft|what|how|which|why|when|should|are|does)\b',
+    re.IGNORECASE
+)
+_EMPTY_QUESTION_REPLY = "Was möchtest du wissen? Frag mich zum Beispiel 'Welche Nährstoffe fehlen mir?'"
+
+# Whisper transcripts keyed by a hash of the audio bytes
+_transcription_cache = ResponseCache(maxsize=256)
+
+# Audio files below this size (about half a second of Telegram's ~16 kbit/s
+# Opus, mostly container headers) hold no speech worth a Whisper round trip.
+# The bot already rejects voice notes by their reported duration.
+_MIN_AUDIO_BYTES = 1024
+
+# Streamed completion texts keyed by a hash of the full request (model, messages,
+# params). Repeated recommendation buckets and unchanged questions skip the round trip.
+_completion_cache = ResponseCache(maxsize=4096, ttl=24 * 3600)
+
+# Meal image analyses keyed by a hash of the image, for re-sent photos
+_meal_image_cache = ResponseCache(maxsize=256, ttl=24 * 3600)
+
+# Intents and parsed meals keyed by the normalized message text, so
+# "Müsli mit Milch" and "müsli  mit milch" share one API call
+_intent_cache = ResponseCache(maxsize=2048, ttl=24 * 3600)
+_meal_text_cache = ResponseCache(maxsize=1024, ttl=24 * 3600)
+
+# Structured output schema for nutrition calls: the API guarantees exactly
+# these keys, so responses need no alias or markdown handling
+_NUTRITION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "meal_nutrition",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "foods": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "quantity_g": {"type": "number"},
+                            **{key: {"type": "number"} for key in NUTRIENT_KEYS}
+                        },
+                        "required": ["name", "quantity_g", *NUTRIENT_KEYS],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["foods"],
+            "additionalProperties": False
+        }
+    }
+}
+
+
+def _completed_content(response, purpose: str) -> Optional[str]:
+    """
+    Get the text of a chat completion that finished normally.
+    
+    Args:
+        response: ChatCompletion response
+        purpose: What the call was for, used in the log message
+    
+    Returns:
+        The message content, or None if the answer was cut off, refused or empty
+    """
+    choice = response.choices[0]
+    if choice.finish_reason != "stop" or choice.message.refusal:
+        logger.warning(
+            f"Incomplete {purpose} response "
+            f"(finish_reason={choice.finish_reason}, refusal={choice.message.refusal!r})"
+        )
+        return None
+    return choice.message.content or None
+
+
+def _normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of a user message, used as a cache key."""
+    return " ".join(text.casefold().split())
+
+
+def _local_intent(text: str) -> Optional[str]:
+    """Intent of a message that is unambiguous from its wording, or None to ask the LLM."""
+    if _SMALL_TALK_RE.match(text):
+        return "greeting"
+    ends_with_question_mark = text.rstrip().endswith("?")
+    question_start = _QUESTION_START_RE.match(text) is not None
+    food_cue = _FOOD_LOG_CUE_RE.search(text) is not None
+    if question_start and (ends_with_question_mark or not food_cue):
+        return "question"
+    if ends_with_question_mark:
+        # "Ich hatte 200g Reis, ist das genug?" both reports and asks
+        return None if food_cue else "question"
+    if _MEAL_LOG_RE.search(text):
+        # "Was habe ich gegessen" is a question without its "?"
+        if question_start or _NEGATION_RE.search(text):
+            return None
+        return "meal_log"
+    return None
+
+
+def _profile_answer(kind: str) -> str:
+    """Answer a week, trimester or due date question from the pregnancy profile."""
+    week = pregnancy_profile.get_current_week()
+    trimester = _TRIMESTER_ORDINALS_DE[pregnancy_profile.get_trimester() - 1]
+    if kind == "week":
+        return f"Du bist in Schwangerschaftswoche {week} - also im {trimester} Trimester. 🤰"
+    if kind == "trimester":
+        return f"Du bist im {trimester} Trimester (Schwangerschaftswoche {week}). 🤰"
+    
+    answer = f"Dein errechneter Geburtstermin ist der {pregnancy_profile.due_date_text}."
+    days_left = (pregnancy_profile.due_date - date.today()).days
+    if days_left > 0:
+        answer += f" Noch {days_left} Tage! 💕"
+    return answer
+
+
+def _pretty_name(nutrient: str) -> str:
+    """Readable nutrient name for prompts."""
+    name = _PRETTY_NAMES.get(nutrient)
+    return name if name is not None else nutrient.replace("_", " ").title()
+
+
+def _estimate_tokens(request: Dict) -> int:
+    """
+    Estimate prompt + completion tokens of a chat request for rate limiting.
+    
+    Args:
+        request: Keyword arguments for chat.completions.create
+    
+    Returns:
+        Approximate token count (about 4 characters per token)
+    """
+    chars = 0
+    images = 0
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                chars += len(part["text"])
+            else:
+                images += 1
+    return chars // 4 + images * _IMAGE_TOKEN_ESTIMATE + request.get("max_tokens", 0)
+
+
+def _encode_file_b64(source: Union[str, os.PathLike, BinaryIO],
+                     out: Optional[bytearray] = None) -> bytearray:
+    """
+    Base64-encode a file chunk by chunk instead of reading it whole.
+    
+    Peak memory is one chunk plus the encoded output, rather than the raw
+    file, its encoding and a str copy all at once.
+    
+    Args:
+        source: Path or binary file object (e.g. io.BufferedReader) to encode from
+        out: Buffer to append the ASCII output to (a new one if omitted)
+    
+    Returns:
+        The buffer holding the encoded data
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return _encode_file_b64(f, out)
+    
+    if out is None:
+        out = bytearray()
+    pending = b""
+    while True:
+        chunk = source.read(_B64_CHUNK_SIZE)
+        if not chunk:
+            break
+        # Short reads are carried over so padding only ever ends the output
+        data = pending + chunk if pending else chunk
+        cut = len(data) - len(data) % 3
+        out += base64.b64encode(data[:cut])
+        pending = data[cut:]
+    out += base64.b64encode(pending)
+    return out
+
+
+def _apply_rate_limit_headers(headers: httpx.Headers):
+    """Tune the limiter to the account limits in x-ratelimit-limit-* response headers."""
+    try:
+        requests_per_minute = int(headers.get("x-ratelimit-limit-requests", 0))
+        tokens_per_minute = int(headers.get("x-ratelimit-limit-tokens", 0))
+    except ValueError:
+        return
+    _rate_limiter.apply_server_limits(requests_per_minute or None, tokens_per_minute or None)
+
+
+def _bulk_concurrency() -> int:
+    """Number of bulk requests to keep in flight under the current request limit."""
+    in_flight = _rate_limiter.requests_per_minute * _BULK_REQUEST_SECONDS // 60
+    return max(1, min(in_flight, _MAX_BULK_CONCURRENCY))
+
+
+def _request_key(kind: str, request: Dict) -> str:
+    """Cache key for a chat request; identical requests give identical keys."""
+    return content_key(kind, json.dumps(request, sort_keys=True, ensure_ascii=False))
+
+
+def _image_mimetype(header: bytes) -> bytes:
+    """Sniff the image mimetype from the file signature, defaulting to JPEG."""
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return b"image/png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return b"image/gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return b"image/webp"
+    return b"image/jpeg"
+
+
+def _image_data_url(image_path: Union[str, os.PathLike]) -> str:
+    """
+    Build a base64 data URL for an image file, downscaling large photos first.
+    
+    Images larger than _MAX_IMAGE_SIDE (or in formats the API does not take)
+    are re-encoded as a JPEG thumbnail. Small images are sent unchanged: the
+    mimetype is sniffed from the file signature and the file is encoded in
+    chunks straight into the URL buffer.
+    """
+    try:
+        with Image.open(image_path) as image:
+            if max(image.size) > _MAX_IMAGE_SIDE or image.format not in _UPLOADABLE_IMAGE_FORMATS:
+                return _downscaled_data_url(image)
+    except UnidentifiedImageError:
+        pass  # Not decodable here; let the API judge the original bytes
+    
+    with open(image_path, "rb") as f:
+        url = bytearray(b"data:" + _image_mimetype(f.read(12)) + b";base64,")
+        f.seek(0)
+        _encode_file_b64(f, url)
+    return url.decode("ascii")
+
+
+def _downscaled_data_url(image: Image.Image) -> str:
+    """Re-encode an image as an upright JPEG no larger than _MAX_IMAGE_SIDE and return its data URL."""
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((_MAX_IMAGE_SIDE, _MAX_IMAGE_SIDE), Image.LANCZOS)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=_DOWNSCALED_JPEG_QUALITY, optimize=True)
+    buffer.seek(0)
+    url = bytearray(b"data:image/jpeg;base64,")
+    _encode_file_b64(buffer, url)
+    return url.decode("ascii")
+
+
+async def close_shared_client():
+    """Close the shared OpenAI client and its connection pool on application shutdown."""
+    await _openai_client.close()
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run an OpenAIService coroutine from synchronous code and wait for its result.
+    
+    All synchronous callers share one long-lived event loop thread, so the
+    pooled HTTP/2 connections stay bound to a single loop (a fresh
+    asyncio.run() per call would strand them on closed loops).
+    
+    Args:
+        coro: Coroutine to run, e.g. service.analyze_meal_image(path)
+    
+    Returns:
+        The coroutine's result
+    """
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_sync_loop.run_forever, name="openai-sync-loop", daemon=True
+            ).start()
+    return asyncio.run_coroutine_threadsafe(coro, _sync_loop).result()
+
 
 class OpenAIService:
     """Handles OpenAI API calls for image analysis and recommendations."""
     
     def __init__(self):
-        """Initialize OpenAI client."""
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        """Initialize with the shared async OpenAI client."""
+        self.client = _openai_client
     
-    def classify_user_intent(self, text: str) -> str:
+    async def classify_user_intent(self, text: str) -> str:
         """
         Use LLM to classify user intent. Returns one of:
         - 'meal_log': User wants to LOG a meal they ate (e.g., "Ich hatte Hähnchen mit Reis")
@@ -28,24 +544,23 @@ class OpenAIService:
         Returns:
             Intent classification string
         """
-        response = self.client.chat.completions.create(
+        # Clear-cut messages are classified without an API call
+        intent = _local_intent(text)
+        if intent is not None:
+            return intent
+        
+        # Common messages repeat across users
+        cache_key = _normalize_text(text)
+        cached = _intent_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        response = await self._chat(
             model="gpt-4o-mini",
             messages=[
                 {
                     "role": "system",
-                    "content": """Classify the user's intent into exactly ONE of these categories:
-- meal_log: User is TELLING you about a meal they want to LOG (stating what they ate/are eating as a fact to record)
-- question: User is ASKING something - a question about nutrition, what they've eaten, recommendations, pregnancy, or anything else
-- greeting: User is greeting, saying hello, or casual chat
-
-IMPORTANT distinctions:
-- "Ich hatte Hähnchen zum Mittag" = meal_log (stating a meal to record)
-- "Was habe ich heute gegessen?" = question (asking about past meals)
-- "Wie ist meine Ernährung?" = question (asking for evaluation)
-- "Zum Frühstück gab es Müsli" = meal_log (reporting breakfast)
-- "Welche Nährstoffe fehlen mir?" = question (asking about nutrients)
-
-Respond with ONLY the category name, nothing else."""
+                    "content": _INTENT_SYSTEM
                 },
                 {
                     "role": "user",
@@ -60,16 +575,19 @@ Respond with ONLY the category name, nothing else."""
         
         # Normalize response
         if "meal" in intent or "log" in intent:
-            return "meal_log"
+            intent = "meal_log"
         elif "question" in intent or "ask" in intent:
-            return "question"
+            intent = "question"
         elif "greet" in intent or "hello" in intent:
-            return "greeting"
+            intent = "greeting"
         else:
             # Default to question to avoid accidentally logging meals
-            return "question"
+            intent = "question"
+        
+        _intent_cache.set(cache_key, intent)
+        return intent
     
-    def analyze_meal_image(self, image_path: str) -> Dict:
+    async def analyze_meal_image(self, image_path: str) -> Dict:
         """
         Analyze a meal image using OpenAI Vision API and extract nutrition directly from LLM.
         
@@ -79,384 +597,156 @@ Respond with ONLY the category name, nothing else."""
         Returns:
             Dictionary with 'food_items' list (with nutrients) and 'analysis' text
         """
-        # Read image and encode as base64
-        with open(image_path, "rb") as f:
-            image_bytes = f.read()
-            image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+        # Downscale and encode as a base64 data URL off the event loop;
+        # decoding and resizing a phone photo is CPU work
+        image_url = await asyncio.to_thread(_image_data_url, image_path)
         
-        # Step 1: Identify foods in the image
-        response = self.client.chat.completions.create(
+        # A re-sent photo gets the earlier analysis without any API call
+        cache_key = content_key("meal-image", image_url)
+        cached = _meal_image_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        # Identify the foods and get their nutrition in one vision call
+        response = await self._chat(
             model="gpt-4o",
             messages=[
                 {
                     "role": "system",
-                    "content": "You are a nutrition expert. Identify foods in the image and estimate portions."
+                    "content": _SYSTEM_MEAL_VISION
                 },
                 {
                     "role": "user",
                     "content": [
                         {
                             "type": "text",
-                            "text": "What foods do you see in this meal? List each food with estimated quantity in grams. Be specific about the food type (e.g., 'grilled beef steak' not just 'meat')."
+                            "text": _USER_MEAL_INSTRUCTIONS
                         },
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_base64}"
+                                "url": image_url,
+                                "detail": OPENAI_IMAGE_DETAIL
                             }
                         }
                     ]
                 }
             ],
-            max_tokens=500
-        )
-        
-        foods_identified = response.choices[0].message.content
-        
-        # Step 2: Get nutrition for the identified foods
-        nutrition_response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are a nutrition database. Return ONLY valid JSON with nutrition data.
-Use this exact format:
-{"foods": [{"name": "food name", "quantity_g": 100, "calories": 200, "protein_g": 20, "carbs_g": 10, "fat_g": 5, "fiber_g": 2, "iron_mg": 2.5, "calcium_mg": 50, "folate_mcg": 30, "vitamin_c_mg": 10, "zinc_mg": 3}]}"""
-                },
-                {
-                    "role": "user",
-                    "content": f"""Based on these foods identified in a meal, provide complete nutrition data as JSON:
-
-{foods_identified}
-
-Return ONLY the JSON object, no other text. Include all foods with their estimated quantities and full nutritional values."""
-                }
-            ],
-            max_tokens=1000
+            response_format=_NUTRITION_RESPONSE_FORMAT,  # Schema-conformant JSON
+            max_tokens=1500
         )
         
-        nutrition_text = nutrition_response.choices[0].message.content
-        
-        # Parse the JSON response
-        food_items = self._parse_nutrition_json(nutrition_text, foods_identified)
+        # A cut-off or refused answer yields no food items; the caller reports
+        # the failure instead of saving a made-up entry, and nothing is cached
+        nutrition_text = _completed_content(response, "meal image")
+        if nutrition_text is None:
+            return {"food_items": [], "analysis": ""}
+        food_items = self._parse_nutrition_json(nutrition_text)
+        if not food_items:
+            return {"food_items": [], "analysis": ""}
         
-        return {
+        result = {
             "food_items": food_items,
-            "analysis": foods_identified
+            "analysis": "\n".join(f"{item['name']} ({item['quantity']}g)" for item in food_items)
         }
+        _meal_image_cache.set(cache_key, copy.deepcopy(result))
+        return result
     
-    def _parse_food_items(self, analysis_text: str) -> List[Dict[str, any]]:
+    async def analyze_meal_images_batch(self, image_paths: List[str]) -> List[Dict]:
         """
-        Parse food items from OpenAI response text.
+        Analyze several meal images concurrently, e.g. a photo album sent at once.
         
         Args:
-            analysis_text: Text response from OpenAI
+            image_paths: Paths to the image files
         
         Returns:
-            List of food item dictionaries with 'name' and 'quantity'
+            One analyze_meal_image result per path, in the same order
         """
-        import re
-        food_items = []
-        lines = analysis_text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            # Remove bullet points and common prefixes
-            line = re.sub(r'^[-•\d.)]+\s*', '', line)
-            line = line.strip()
-            
-            # Pattern 1: "food name - approximately 200g (100g)" or similar
-            # Extract the first quantity mentioned (usually the actual estimate)
-            match = re.search(r'(.+?)\s*[-–—]\s*(?:approximately\s*)?(\d+)\s*g', line, re.IGNORECASE)
-            if match:
-                name = match.group(1).strip()
-                quantity = int(match.group(2))
-                # Clean up name - remove extra descriptions
-                name = re.sub(r'\s*\([^)]*\)\s*', '', name)  # Remove parenthetical notes
-                name = re.sub(r'\s*-\s*.*$', '', name)  # Remove everything after dash
-                name = name.strip()
-                if name:
-                    food_items.append({"name": name, "quantity": quantity})
-                continue
-            
-            # Pattern 2: "150g food name"
-            match = re.search(r'(\d+)\s*g\s+(.+)', line, re.IGNORECASE)
-            if match:
-                quantity = int(match.group(1))
-                name = match.group(2).strip()
-                # Clean up name
-                name = re.sub(r'\s*\([^)]*\)\s*', '', name)
-                name = re.sub(r'\s*-\s*.*$', '', name)
-                name = name.strip()
-                if name:
-                    food_items.append({"name": name, "quantity": quantity})
-                continue
-            
-            # Pattern 3: "food name (150g)" or "food name (3 pieces) (30g)"
-            # Try to get the last quantity in parentheses
-            match = re.findall(r'\((\d+)\s*g\)', line, re.IGNORECASE)
-            if match:
-                quantity = int(match[-1])  # Use last quantity found
-                # Extract food name (everything before first parenthesis)
-                name = re.split(r'\(', line)[0].strip()
-                name = re.sub(r'\s*-\s*.*$', '', name)
-                name = name.strip()
-                if name:
-                    food_items.append({"name": name, "quantity": quantity})
-                continue
-            
-            # Pattern 4: "food name - description" (try to extract food name)
-            if ' - ' in line or '–' in line:
-                name = re.split(r'[-–—]', line)[0].strip()
-                # Try to find quantity in the description part
-                quantity_match = re.search(r'(\d+)\s*g', line, re.IGNORECASE)
-                quantity = int(quantity_match.group(1)) if quantity_match else 100
-                name = re.sub(r'\s*\([^)]*\)\s*', '', name)
-                if name and len(name) > 2:
-                    food_items.append({"name": name, "quantity": quantity})
-                continue
-            
-            # Pattern 5: Just food name (default to 100g)
-            if line and len(line) > 2:
-                # Remove parenthetical notes
-                clean_line = re.sub(r'\s*\([^)]*\)\s*', '', line)
-                clean_line = clean_line.strip()
-                # Skip if it looks like a description or instruction
-                if not any(word in clean_line.lower() for word in ['format', 'provide', 'list', 'item', 'food']):
-                    food_items.append({"name": clean_line, "quantity": 100})
-        
-        # If no items found, try to extract from text more loosely
-        if not food_items:
-            # Look for food mentions with quantities
-            food_quantity_pattern = re.findall(r'(\d+)\s*g\s+([a-z]+(?:\s+[a-z]+)*)', analysis_text.lower())
-            for quantity, food in food_quantity_pattern:
-                food_items.append({"name": food, "quantity": int(quantity)})
-        
-        # Clean up food names - remove common prefixes/suffixes
-        for item in food_items:
-            name = item["name"].lower()
-            # Remove common descriptive words that aren't part of food name
-            name = re.sub(r'\b(sliced|diced|chopped|grilled|roasted|cooked|raw|fresh|approximately|about|around)\b', '', name)
-            name = re.sub(r'\s+', ' ', name).strip()
-            item["name"] = name
-        
-        return food_items if food_items else [{"name": "unidentified meal", "quantity": 100}]
+        return list(await asyncio.gather(*(self.analyze_meal_image(path) for path in image_paths)))
     
-    def _parse_nutrition_json(self, nutrition_text: str, fallback_text: str) -> List[Dict[str, any]]:
+    def _parse_nutrition_json(self, nutrition_text: str) -> List[Dict[str, any]]:
         """
         Parse nutrition JSON from LLM response.
         
         Args:
-            nutrition_text: JSON response from OpenAI
-            fallback_text: Original food identification text for fallback
+            nutrition_text: JSON response from OpenAI (a completed structured output)
         
         Returns:
-            List of food item dictionaries with 'name', 'quantity', and 'nutrients'
+            List of food item dictionaries with 'name', 'quantity', and 'nutrients';
+            empty if the response does not match the schema
         """
-        import json
-        import re
-        
-        food_items = []
-        
-        # Clean up the response - extract JSON if wrapped in markdown
-        clean_text = nutrition_text.strip()
-        if "```json" in clean_text:
-            clean_text = clean_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in clean_text:
-            clean_text = clean_text.split("```")[1].split("```")[0].strip()
-        
-        # Try to parse as JSON
         try:
-            data = json.loads(clean_text)
-            
-            # Handle different JSON structures
-            items = []
-            if isinstance(data, dict):
-                if "foods" in data:
-                    items = data["foods"]
-                elif "items" in data:
-                    items = data["items"]
-                elif "meal" in data:
-                    items = data["meal"] if isinstance(data["meal"], list) else [data["meal"]]
-                else:
-                    # Try to find any list in the data
-                    for key, value in data.items():
-                        if isinstance(value, list):
-                            items = value
-                            break
-                    if not items:
-                        items = [data]
-            elif isinstance(data, list):
-                items = data
-            
-            for item in items:
-                if not isinstance(item, dict):
-                    continue
-                    
-                # Extract name
-                name = item.get("name", item.get("food", item.get("item", "")))
-                if not name:
-                    continue
-                
-                # Extract quantity
-                quantity = item.get("quantity_g", item.get("quantity", item.get("grams", item.get("amount_g", 100))))
-                if isinstance(quantity, str):
-                    # Extract number from string like "200g"
-                    match = re.search(r'(\d+)', quantity)
-                    quantity = int(match.group(1)) if match else 100
-                
-                # Extract nutrients - check various key formats
-                nutrients = {}
-                nutrient_mappings = {
-                    "calories": ["calories", "kcal", "energy", "cal"],
-                    "protein_g": ["protein_g", "protein", "proteins"],
-                    "carbohydrates_g": ["carbs_g", "carbohydrates_g", "carbohydrates", "carbs"],
-                    "fiber_g": ["fiber_g", "fiber", "fibre"],
-                    "fat_g": ["fat_g", "fat", "fats", "total_fat"],
-                    "iron_mg": ["iron_mg", "iron"],
-                    "calcium_mg": ["calcium_mg", "calcium"],
-                    "folate_mcg": ["folate_mcg", "folate", "folic_acid"],
-                    "vitamin_c_mg": ["vitamin_c_mg", "vitamin_c", "vitaminC"],
-                    "vitamin_d_iu": ["vitamin_d_iu", "vitamin_d", "vitaminD"],
-                    "vitamin_a_mcg": ["vitamin_a_mcg", "vitamin_a", "vitaminA"],
-                    "vitamin_b12_mcg": ["vitamin_b12_mcg", "vitamin_b12", "b12"],
-                    "zinc_mg": ["zinc_mg", "zinc"],
-                    "omega3_g": ["omega3_g", "omega3", "omega_3"]
+            return [
+                {
+                    "name": item["name"],
+                    "quantity": int(item["quantity_g"]),
+                    "nutrients": {key: float(item[key]) for key in NUTRIENT_KEYS}
                 }
-                
-                for standard_key, possible_keys in nutrient_mappings.items():
-                    for key in possible_keys:
-                        if key in item:
-                            try:
-                                value = item[key]
-                                if isinstance(value, (int, float)):
-                                    nutrients[standard_key] = float(value)
-                                elif isinstance(value, str):
-                                    # Extract number from string
-                                    match = re.search(r'([\d.]+)', value)
-                                    if match:
-                                        nutrients[standard_key] = float(match.group(1))
-                            except:
-                                pass
-                            break
-                
-                food_items.append({
-                    "name": name,
-                    "quantity": int(quantity),
-                    "nutrients": nutrients
-                })
-            
-            if food_items:
-                return food_items
-                
-        except json.JSONDecodeError:
-            pass
-        except Exception as e:
-            print(f"Error parsing nutrition JSON: {e}")
-        
-        # Fallback: Try to parse the original food identification text
-        return self._parse_food_items_fallback(fallback_text)
+                for item in json.loads(nutrition_text)["foods"]
+                if item["name"]
+            ]
+        except (ValueError, KeyError, TypeError) as e:
+            # Strict structured outputs should never get here; callers treat
+            # an empty list as "no foods recognized"
+            logger.warning(f"Nutrition JSON does not match the schema: {e}")
+            return []
     
-    def _parse_food_items_fallback(self, text: str) -> List[Dict[str, any]]:
-        """
-        Fallback parser for when JSON parsing fails.
+    async def _chat(self, **request):
         """
-        import re
-        food_items = []
+        Run a chat completion once the rate limiter admits it.
         
-        lines = text.split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Remove bullet points
-            line = re.sub(r'^[-•*\d.)]+\s*', '', line)
-            
-            # Try to find food with quantity
-            # Pattern: "Food name - approximately 200g" or "200g of food name" or "food name (200g)"
-            patterns = [
-                r'(.+?)\s*[-–]\s*(?:approximately\s*)?(\d+)\s*g',  # "Steak - approximately 200g"
-                r'(\d+)\s*g\s+(?:of\s+)?(.+)',  # "200g of steak"
-                r'(.+?)\s*\((\d+)\s*g\)',  # "Steak (200g)"
-                r'(.+?)\s*:\s*(\d+)\s*g',  # "Steak: 200g"
-            ]
-            
-            found = False
-            for pattern in patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    groups = match.groups()
-                    if pattern.startswith(r'(\d+)'):  # quantity first pattern
-                        quantity, name = int(groups[0]), groups[1].strip()
-                    else:
-                        name, quantity = groups[0].strip(), int(groups[1])
-                    
-                    if name and len(name) > 1:
-                        food_items.append({
-                            "name": name,
-                            "quantity": quantity,
-                            "nutrients": {}  # Will need to estimate
-                        })
-                        found = True
-                        break
-            
-            # If no pattern matched but line looks like a food
-            if not found and len(line) > 2 and not any(x in line.lower() for x in ['total', 'summary', 'note']):
-                food_items.append({
-                    "name": line[:50],  # Limit length
-                    "quantity": 100,
-                    "nutrients": {}
-                })
+        Args:
+            request: Keyword arguments for chat.completions.create
         
-        return food_items if food_items else [{"name": "meal", "quantity": 100, "nutrients": {}}]
+        Returns:
+            The ChatCompletion response
+        """
+        await _rate_limiter.acquire(_estimate_tokens(request))
+        raw_response = await self.client.chat.completions.with_raw_response.create(**request)
+        _apply_rate_limit_headers(raw_response.headers)
+        return raw_response.parse()
     
-    def _parse_nutrients_from_text(self, text: str, quantity: int) -> Dict[str, float]:
+    async def _stream_chat(self, cache: bool = False, **request) -> AsyncIterator[str]:
         """
-        Parse nutrient values from text description.
+        Run a streaming chat completion and yield text as it arrives.
         
         Args:
-            text: Text containing nutrient information
-            quantity: Quantity in grams (to normalize to per-100g if needed)
+            cache: Replay the text of an identical earlier request at once
+            request: Keyword arguments for chat.completions.create
         
-        Returns:
-            Dictionary of nutrient values
-        """
-        import re
-        nutrients = {}
-        
-        # Pattern matching for common nutrients
-        patterns = {
-            "calories": r'(\d+(?:\.\d+)?)\s*(?:cal|kcal|calories)',
-            "protein_g": r'(\d+(?:\.\d+)?)\s*g\s+protein',
-            "carbohydrates_g": r'(\d+(?:\.\d+)?)\s*g\s+carbs?',
-            "fiber_g": r'(\d+(?:\.\d+)?)\s*g\s+fiber',
-            "fat_g": r'(\d+(?:\.\d+)?)\s*g\s+fat',
-            "folate_mcg": r'(\d+(?:\.\d+)?)\s*mcg\s+folate',
-            "iron_mg": r'(\d+(?:\.\d+)?)\s*mg\s+iron',
-            "calcium_mg": r'(\d+(?:\.\d+)?)\s*mg\s+calcium',
-            "vitamin_d_iu": r'(\d+(?:\.\d+)?)\s*iu\s+vitamin\s*d',
-            "vitamin_c_mg": r'(\d+(?:\.\d+)?)\s*mg\s+vitamin\s*c',
-            "vitamin_a_mcg": r'(\d+(?:\.\d+)?)\s*mcg\s+vitamin\s*a',
-            "vitamin_b12_mcg": r'(\d+(?:\.\d+)?)\s*mcg\s+(?:vitamin\s*)?b12',
-            "zinc_mg": r'(\d+(?:\.\d+)?)\s*mg\s+zinc',
-            "omega3_g": r'(\d+(?:\.\d+)?)\s*g\s+omega\s*3'
-        }
+        Yields:
+            Non-empty content deltas
+        """
+        cache_key = _request_key("stream", request) if cache else None
+        if cache_key is not None:
+            cached = _completion_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
         
-        for nutrient_key, pattern in patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                value = float(match.group(1))
-                # If the value seems to be for the full quantity, we keep it as is
-                # (LLM should provide values for the actual quantity)
-                nutrients[nutrient_key] = value
+        await _rate_limiter.acquire(_estimate_tokens(request))
+        raw_response = await self.client.chat.completions.with_raw_response.create(stream=True, **request)
+        _apply_rate_limit_headers(raw_response.headers)
+        stream = raw_response.parse()
+        parts = []
+        finish_reason = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            if chunk.choices[0].finish_reason:
+                finish_reason = chunk.choices[0].finish_reason
+            if chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
         
-        return nutrients
+        # Only an answer the model finished on its own is cached; one cut off
+        # at max_tokens or by the content filter is requested afresh next time
+        if cache_key is not None and parts and finish_reason == "stop":
+            _completion_cache.set(cache_key, "".join(parts))
+        elif finish_reason != "stop":
+            logger.warning(f"Incomplete streamed response (finish_reason={finish_reason})")
     
-    def generate_recommendations(self, missing_nutrients: Dict[str, float], 
+    async def generate_recommendations(self, missing_nutrients: Dict[str, float], 
                                 daily_totals: Dict[str, float],
                                 requirements: Dict[str, float]) -> str:
         """
@@ -470,63 +760,242 @@ Return ONLY the JSON object, no other text. Include all foods with their estimat
         Returns:
             Recommendation text
         """
-        # Get pregnancy context
-        profile_context = pregnancy_profile.get_context_string()
-        trimester_focus = pregnancy_profile.get_trimester_focus_nutrients()
+        return "".join([
+            chunk async for chunk in
+            self.stream_recommendations(missing_nutrients, daily_totals, requirements)
+        ])
+    
+    def _recommendation_request(self, missing_nutrients: Dict[str, float],
+                                daily_totals: Dict[str, float],
+                                requirements: Dict[str, float]) -> Optional[Dict]:
+        """
+        Build the chat completion request for meal recommendations.
         
-        # Format missing nutrients for the prompt
-        missing_list = []
-        for nutrient, deficit in missing_nutrients.items():
-            if deficit > 0:
-                nutrient_name = nutrient.replace("_", " ").title()
-                missing_list.append(f"- {nutrient_name}: {deficit:.1f} units below target")
+        Shared by the realtime and batch paths so both send identical prompts.
         
-        missing_text = "\n".join(missing_list) if missing_list else "None - you're meeting all targets!"
+        Args:
+            missing_nutrients: Dictionary of nutrients below requirements
+            daily_totals: Current daily nutrient totals
+            requirements: Daily nutritional requirements
         
-        prompt = f"""You are a nutritionist helping a pregnant woman optimize her diet.
-
-{LANGUAGE_INSTRUCTION}
-
-{profile_context}
-
-{trimester_focus}
-
-Current daily intake:
-- Calories: {daily_totals.get('calories', 0):.0f} / {requirements.get('calories', 0):.0f}
-- Protein: {daily_totals.get('protein_g', 0):.1f}g / {requirements.get('protein_g', 0):.1f}g
-- Iron: {daily_totals.get('iron_mg', 0):.1f}mg / {requirements.get('iron_mg', 0):.1f}mg
-- Folate: {daily_totals.get('folate_mcg', 0):.1f}mcg / {requirements.get('folate_mcg', 0):.1f}mcg
-- Calcium: {daily_totals.get('calcium_mg', 0):.1f}mg / {requirements.get('calcium_mg', 0):.1f}mg
-
-Nutrients that need attention:
-{missing_text}
-
-Provide 2-3 specific, practical meal or snack suggestions that would help address the missing nutrients, considering her current trimester. Be encouraging and pregnancy-appropriate. Keep it concise (2-3 sentences per suggestion)."""
+        Returns:
+            Keyword arguments for chat.completions.create, or None if nothing is missing
+        """
+        missing_list = [
+            f"- {_pretty_name(nutrient)}: {deficit:.1f} units below target"
+            for nutrient, deficit in missing_nutrients.items()
+            if deficit > 0
+        ]
+        if not missing_list:
+            return None
+        
+        prompt = _RECOMMENDATION_TEMPLATE.format(
+            totals=NutrientTotals.from_dict(daily_totals),
+            req=NutrientTotals.from_dict(requirements),
+            profile_context=pregnancy_profile.get_context_string(),
+            trimester_focus=pregnancy_profile.get_trimester_focus_nutrients(),
+            missing_text="\n".join(missing_list)
+        )
 
         # Text Model Options (cost per 1M tokens - input/output):
         # - gpt-4o-mini: $0.15/$0.60 (CHEAPEST - RECOMMENDED)
         # - gpt-5.1-mini: $0.20/$1.60 (2.7x more expensive for output)
         # - gpt-5.2-mini: $0.25/$2.00 (3.3x more expensive for output)
         # GPT-4o-mini is still the most cost-effective for text generation
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",  # Cheapest option. Try "gpt-5.1-mini" if you need better reasoning
-            messages=[
+        return {
+            "model": "gpt-4o-mini",  # Cheapest option. Try "gpt-5.1-mini" if you need better reasoning
+            "messages": [
                 {
                     "role": "system",
-                    "content": f"You are a friendly, supportive nutritionist specializing in pregnancy nutrition. {LANGUAGE_INSTRUCTION} Provide practical, encouraging advice."
+                    "content": _SYSTEM_NUTRITIONIST
                 },
                 {
                     "role": "user",
                     "content": prompt
                 }
             ],
-            max_tokens=300,
-            temperature=0.7
+            "max_tokens": 250,
+            "temperature": 0.7
+        }
+    
+    async def stream_recommendations(self, missing_nutrients: Dict[str, float],
+                               daily_totals: Dict[str, float],
+                               requirements: Dict[str, float]) -> AsyncIterator[str]:
+        """
+        Stream personalized meal recommendations as the model generates them.
+        
+        Args:
+            missing_nutrients: Dictionary of nutrients below requirements
+            daily_totals: Current daily nutrient totals
+            requirements: Daily nutritional requirements
+        
+        Yields:
+            Chunks of recommendation text
+        """
+        request = self._recommendation_request(missing_nutrients, daily_totals, requirements)
+        
+        # Nothing to fix - skip the API call entirely
+        if request is None:
+            yield _ON_TRACK_RECOMMENDATION
+            return
+        
+        async for chunk in self._stream_chat(cache=True, **request):
+            yield chunk
+    
+    async def generate_recommendations_bulk(self, jobs: List[Dict]) -> List[Optional[str]]:
+        """
+        Generate recommendations for many users at once, e.g. for a scheduled digest.
+        
+        The first job runs alone so its response headers tune the rate limiter
+        to the account limits; the remaining jobs then run concurrently, bounded
+        by a semaphore sized from the request limit. Unlike
+        submit_batch_recommendations, results are available immediately.
+        A failing job (rate limit, timeout, refusal) is logged and leaves its
+        slot as None; the other results are still returned.
+        
+        Args:
+            jobs: Dicts with 'missing_nutrients', 'daily_totals' and 'requirements'
+        
+        Returns:
+            Recommendation text per job, in job order (None where the job failed)
+        """
+        if not jobs:
+            return []
+        
+        async def recommend(index: int, job: Dict) -> Optional[str]:
+            try:
+                return await self.generate_recommendations(
+                    job["missing_nutrients"], job["daily_totals"], job["requirements"]
+                )
+            except Exception as e:
+                logger.error(f"Bulk recommendation job {index} failed: {e}")
+                return None
+        
+        first = await recommend(0, jobs[0])
+        semaphore = asyncio.Semaphore(_bulk_concurrency())
+        
+        async def bounded(index: int, job: Dict) -> Optional[str]:
+            async with semaphore:
+                return await recommend(index, job)
+        
+        rest = await asyncio.gather(*(bounded(index, job) for index, job in enumerate(jobs[1:], start=1)))
+        return [first, *rest]
+    
+    async def submit_batch_recommendations(self, jobs: List[Dict]) -> Optional[str]:
+        """
+        Submit recommendation jobs to the OpenAI Batch API (half price, results within 24h).
+        
+        Meant for non-interactive work such as nightly digests or backfills;
+        interactive requests stay on the realtime API. Jobs with no missing
+        nutrients are not submitted and get no entry from poll_batch.
+        
+        Args:
+            jobs: Dicts with 'custom_id', 'missing_nutrients', 'daily_totals' and 'requirements'
+        
+        Returns:
+            Batch ID for poll_batch, or None if no job needed a recommendation
+        """
+        lines = []
+        for job in jobs:
+            request = self._recommendation_request(
+                job["missing_nutrients"], job["daily_totals"], job["requirements"]
+            )
+            if request is None:
+                continue
+            lines.append(json.dumps({
+                "custom_id": str(job["custom_id"]),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": request
+            }, ensure_ascii=False))
+        
+        if not lines:
+            return None
+        
+        batch_file = await self.client.files.create(
+            file=("recommendations.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
         )
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+    
+    async def poll_batch(self, batch_id: str, initial_delay: float = 30.0,
+                         max_delay: float = 600.0) -> Dict[str, Optional[str]]:
+        """
+        Wait for a batch to finish and collect its recommendation texts.
+        
+        Args:
+            batch_id: ID returned by submit_batch_recommendations
+            initial_delay: Seconds to wait after the first unfinished status check
+            max_delay: Upper bound for the wait, which doubles after every check
         
-        return response.choices[0].message.content
+        Returns:
+            Recommendation text per custom_id (None for requests that failed)
+        
+        Raises:
+            RuntimeError: If the batch failed, expired or was cancelled
+        """
+        delay = initial_delay
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+                else:
+                    results[record["custom_id"]] = None
+        return results
+    
+    async def stream_chat_reply(self, system_prompt: str, prompt: str,
+                                max_tokens: int = 200) -> AsyncIterator[str]:
+        """
+        Stream a short conversational reply, e.g. to greetings or unclear messages.
+        
+        Args:
+            system_prompt: System message setting the assistant's role
+            prompt: User message including any context
+            max_tokens: Maximum length of the reply
+        
+        Yields:
+            Chunks of the reply text
+        """
+        async for chunk in self._stream_chat(
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            max_tokens=max_tokens,
+            temperature=0.7
+        ):
+            yield chunk
     
-    def transcribe_voice(self, audio_path: str) -> str:
+    async def transcribe_voice(self, audio_path: str) -> str:
         """
         Transcribe voice message using OpenAI Whisper API.
         
@@ -534,24 +1003,40 @@ Provide 2-3 specific, practical meal or snack suggestions that would help addres
             audio_path: Path to the audio file
         
         Returns:
-            Transcribed text
+            Transcribed text (empty if the recording is too short to contain speech)
         """
+        # Read the audio once: the same bytes are hashed and uploaded
         with open(audio_path, "rb") as audio_file:
-            transcript = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language="de"  # German transcription
-            )
-        return transcript.text
+            raw_audio = audio_file.read()
+        
+        if len(raw_audio) < _MIN_AUDIO_BYTES:
+            return ""
+        
+        # Telegram retries and forwarded voice notes deliver identical audio
+        cache_key = content_key("whisper-1", "de", raw_audio)
+        cached = _transcription_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        await _rate_limiter.acquire()
+        transcript = await self.client.audio.transcriptions.create(
+            model="whisper-1",
+            file=(os.path.basename(audio_path), raw_audio),
+            language="de",  # German transcription
+            response_format="text"  # Plain string body, no JSON envelope
+        )
+        transcript = transcript.strip()
+        _transcription_cache.set(cache_key, transcript)
+        return transcript
     
-    def parse_meal_description(self, text: str) -> Dict:
+    async def parse_meal_description(self, text: str) -> Dict:
         """
         Parse meal description from text to extract foods and quantities.
         DEPRECATED: Use parse_meal_description_with_nutrients instead.
         """
-        return self.parse_meal_description_with_nutrients(text)
+        return await self.parse_meal_description_with_nutrients(text)
     
-    def parse_meal_description_with_nutrients(self, text: str) -> Dict:
+    async def parse_meal_description_with_nutrients(self, text: str) -> Dict:
         """
         Parse meal description from text and extract foods with nutrition values directly from LLM.
         
@@ -561,15 +1046,19 @@ Provide 2-3 specific, practical meal or snack suggestions that would help addres
         Returns:
             Dictionary with 'food_items' list (each with nutrients)
         """
+        # Users log the same meals again and again, often with different casing
+        cache_key = _normalize_text(text)
+        cached = _meal_text_cache.get(cache_key)
+        if cached is not None:
+            return {"food_items": copy.deepcopy(cached), "analysis": text}
+        
         # Ask LLM to return nutrition data as JSON
-        response = self.client.chat.completions.create(
+        response = await self._chat(
             model="gpt-4o-mini",
             messages=[
                 {
                     "role": "system",
-                    "content": """You are a nutrition database. Return ONLY valid JSON with nutrition data.
-Use this exact format:
-{"foods": [{"name": "food name", "quantity_g": 100, "calories": 200, "protein_g": 20, "carbs_g": 10, "fat_g": 5, "fiber_g": 2, "iron_mg": 2.5, "calcium_mg": 50, "folate_mcg": 30, "vitamin_c_mg": 10, "zinc_mg": 3}]}"""
+                    "content": _SYSTEM_NUTRITION_DB
                 },
                 {
                     "role": "user",
@@ -580,11 +1069,16 @@ Use this exact format:
 Return ONLY the JSON object. Estimate quantities if not specified. Use standard nutrition values."""
                 }
             ],
-            max_tokens=800
+            response_format=_NUTRITION_RESPONSE_FORMAT,  # Schema-conformant JSON
+            max_tokens=1500
         )
         
-        nutrition_text = response.choices[0].message.content
-        food_items = self._parse_nutrition_json(nutrition_text, text)
+        # A cut-off or refused answer yields no food items, which the bot reports
+        nutrition_text = _completed_content(response, "meal description")
+        food_items = self._parse_nutrition_json(nutrition_text) if nutrition_text is not None else []
+        if food_items:
+            # Only a real parse is reused; a failed one is retried next time
+            _meal_text_cache.set(cache_key, copy.deepcopy(food_items))
         
         return {"food_items": food_items, "analysis": text}
     
@@ -599,54 +1093,32 @@ Return ONLY the JSON object. Estimate quantities if not specified. Use standard
         Returns:
             Datetime object or None if no time context found
         """
-        from datetime import datetime, timedelta
-        import re
-        
         text_lower = text.lower()
-        now = datetime.now()
-        
-        # Helper function to determine meal time
-        def get_meal_time(text_lower: str, base_date: datetime) -> datetime:
-            # Breakfast (English + German)
-            if any(term in text_lower for term in ["breakfast", "frühstück", "fruehstueck"]):
-                return base_date.replace(hour=8, minute=0, second=0, microsecond=0)
-            # Lunch (English + German)
-            elif any(term in text_lower for term in ["lunch", "mittagessen", "mittag"]):
-                return base_date.replace(hour=13, minute=0, second=0, microsecond=0)
-            # Dinner (English + German)
-            elif any(term in text_lower for term in ["dinner", "supper", "abendessen", "abend"]):
-                return base_date.replace(hour=19, minute=0, second=0, microsecond=0)
-            # Snack (English + German)
-            elif any(term in text_lower for term in ["snack", "zwischenmahlzeit", "snacks"]):
-                return base_date.replace(hour=15, minute=0, second=0, microsecond=0)
-            return base_date.replace(hour=12, minute=0, second=0, microsecond=0)
-        
-        # Today's meals (English + German: "heute")
-        if any(term in text_lower for term in ["today", "this", "heute", "jetzt", "gerade"]):
-            return get_meal_time(text_lower, now)
-        
-        # Yesterday (English + German: "gestern")
-        if any(term in text_lower for term in ["yesterday", "gestern"]):
-            yesterday = now - timedelta(days=1)
-            return get_meal_time(text_lower, yesterday)
-        
-        # Day before yesterday (German: "vorgestern")
-        if "vorgestern" in text_lower:
-            day_before = now - timedelta(days=2)
-            return get_meal_time(text_lower, day_before)
-        
-        # Days ago (English + German: "vor X tagen")
-        days_match = re.search(r'(\d+)\s+days?\s+ago', text_lower)
-        if not days_match:
-            days_match = re.search(r'vor\s+(\d+)\s+tag', text_lower)
-        if days_match:
-            days = int(days_match.group(1))
-            past_date = now - timedelta(days=days)
-            return get_meal_time(text_lower, past_date)
         
-        return None
+        # One scan collects every day/meal keyword present in the text
+        tags = {_TIME_KEYWORDS[keyword] for keyword in _TIME_KEYWORD_RE.findall(text_lower)}
+        
+        if "today" in tags:
+            days_back = 0
+        elif "yesterday" in tags:
+            days_back = 1
+        elif "day_before_yesterday" in tags:
+            days_back = 2
+        else:
+            # Days ago (English + German: "vor X tagen")
+            days_match = _DAYS_AGO_RE.search(text_lower) or _VOR_TAGEN_RE.search(text_lower)
+            if not days_match:
+                return None
+            days_back = int(days_match.group(1))
+        
+        meal_time = next(
+            (_MEAL_TIMES[meal] for meal in _MEAL_PRIORITY if meal in tags),
+            _DEFAULT_MEAL_TIME
+        )
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return midnight - timedelta(days=days_back) + meal_time
     
-    def answer_nutrition_question(self, question: str, user_id: int, meal_diary, analyzer) -> str:
+    async def answer_nutrition_question(self, question: str, user_id: int, meal_diary, analyzer) -> str:
         """
         Answer ANY question using full context from user's meal diary and profile.
         The LLM has access to all data and decides how to respond.
@@ -660,105 +1132,148 @@ Return ONLY the JSON object. Estimate quantities if not specified. Use standard
         Returns:
             Answer to the question
         """
-        # Get pregnancy context
-        profile_context = pregnancy_profile.get_context_string()
-        trimester_focus = pregnancy_profile.get_trimester_focus_nutrients()
+        return "".join([
+            chunk async for chunk in
+            self.stream_nutrition_answer(question, user_id, meal_diary, analyzer)
+        ])
+    
+    def _format_diary_meals(self, meal_diary, user_id: int) -> Tuple[str, str]:
+        """
+        List today's meals and the last week's meals for the Q&A prompt.
+        
+        Args:
+            meal_diary: MealDiary instance
+            user_id: Telegram user ID
+        
+        Returns:
+            Tuple of (today's meals text, last 7 days' meals text)
+        """
+        # Get today's meals with details
+        daily_meals = meal_diary.get_daily_meals(user_id)
+        daily_meals_text = ""
+        if daily_meals:
+            daily_meals_text = "HEUTIGE MAHLZEITEN:\n"
+            for meal in daily_meals:
+                time_str = meal['timestamp'][:16] if isinstance(meal['timestamp'], str) else meal['timestamp'].strftime('%H:%M')
+                foods = meal.get('food_items', [])
+                food_names = [f.get('name', 'Unbekannt') for f in foods] if isinstance(foods, list) else []
+                daily_meals_text += f"- {time_str}: {', '.join(food_names)}\n"
+        else:
+            daily_meals_text = "HEUTIGE MAHLZEITEN: Noch keine Mahlzeiten eingetragen.\n"
+        
+        # Get weekly meals
+        weekly_meals = meal_diary.get_weekly_meals(user_id)
+        weekly_meals_text = ""
+        if weekly_meals:
+            weekly_meals_text = f"\nMAHLZEITEN DER LETZTEN 7 TAGE ({len(weekly_meals)} Mahlzeiten):\n"
+            # Group by date
+            meals_by_date = defaultdict(list)
+            for meal in weekly_meals:
+                date_str = meal['timestamp'][:10] if isinstance(meal['timestamp'], str) else meal['timestamp'].strftime('%Y-%m-%d')
+                foods = meal.get('food_items', [])
+                food_names = [f.get('name', 'Unbekannt') for f in foods] if isinstance(foods, list) else []
+                meals_by_date[date_str].extend(food_names)
+        
+            for day, foods in sorted(meals_by_date.items(), reverse=True)[:7]:
+                weekly_meals_text += f"- {day}: {', '.join(foods[:5])}{'...' if len(foods) > 5 else ''}\n"
+        
+        return daily_meals_text, weekly_meals_text
+        
+    async def stream_nutrition_answer(self, question: str, user_id: int, meal_diary, analyzer) -> AsyncIterator[str]:
+        """
+        Stream the answer to a user question so the bot can show it while it is generated.
+        
+        Args:
+            question: User's question
+            user_id: Telegram user ID
+            meal_diary: MealDiary instance
+            analyzer: NutritionAnalyzer instance
+        
+        Yields:
+            Chunks of the answer text
+        """
+        # Empty input, small talk and pregnancy date questions get a local reply without an API call
+        if not question.strip():
+            yield _EMPTY_QUESTION_REPLY
+            return
+        small_talk = _SMALL_TALK_RE.match(question)
+        if small_talk:
+            yield _SMALL_TALK_REPLIES[small_talk.lastgroup]
+            return
+        profile_question = _PROFILE_QUESTION_RE.match(question)
+        if profile_question:
+            yield _profile_answer(profile_question.lastgroup)
+            return
         
         # Get ACTUAL MEALS from database (not just totals)
         try:
-            # Get today's meals with details
-            daily_meals = meal_diary.get_daily_meals(user_id)
-            daily_meals_text = ""
-            if daily_meals:
-                daily_meals_text = "HEUTIGE MAHLZEITEN:\n"
-                for meal in daily_meals:
-                    time_str = meal['timestamp'][:16] if isinstance(meal['timestamp'], str) else meal['timestamp'].strftime('%H:%M')
-                    foods = meal.get('food_items', [])
-                    food_names = [f.get('name', 'Unbekannt') for f in foods] if isinstance(foods, list) else []
-                    daily_meals_text += f"- {time_str}: {', '.join(food_names)}\n"
-            else:
-                daily_meals_text = "HEUTIGE MAHLZEITEN: Noch keine Mahlzeiten eingetragen.\n"
-            
-            # Get weekly meals
-            weekly_meals = meal_diary.get_weekly_meals(user_id)
-            weekly_meals_text = ""
-            if weekly_meals:
-                weekly_meals_text = f"\nMAHLZEITEN DER LETZTEN 7 TAGE ({len(weekly_meals)} Mahlzeiten):\n"
-                # Group by date
-                from collections import defaultdict
-                meals_by_date = defaultdict(list)
-                for meal in weekly_meals:
-                    date_str = meal['timestamp'][:10] if isinstance(meal['timestamp'], str) else meal['timestamp'].strftime('%Y-%m-%d')
-                    foods = meal.get('food_items', [])
-                    food_names = [f.get('name', 'Unbekannt') for f in foods] if isinstance(foods, list) else []
-                    meals_by_date[date_str].extend(food_names)
-                
-                for date, foods in sorted(meals_by_date.items(), reverse=True)[:7]:
-                    weekly_meals_text += f"- {date}: {', '.join(foods[:5])}{'...' if len(foods) > 5 else ''}\n"
-            
-            # Get nutrient totals
-            daily_analysis = analyzer.analyze_daily_intake(user_id)
-            weekly_analysis = analyzer.analyze_weekly_intake(user_id)
+            # Meal lists (blocking diary reads, so in a worker thread) and
+            # nutrient totals are gathered concurrently
+            (daily_meals_text, weekly_meals_text), daily_analysis, weekly_analysis = await asyncio.gather(
+                asyncio.to_thread(self._format_diary_meals, meal_diary, user_id),
+                analyzer.analyze_daily_intake(user_id, with_recommendations=False),
+                analyzer.analyze_weekly_intake(user_id, with_recommendations=False)
+            )
             
-            daily_totals = daily_analysis["totals"]
-            daily_requirements = daily_analysis["requirements"]
             daily_missing = daily_analysis["missing_nutrients"]
-            
-            weekly_totals = weekly_analysis["totals"]
-            weekly_requirements = weekly_analysis["requirements"]
+            missing_text = (
+                ', '.join([_pretty_name(k) for k, v in daily_missing.items() if v > 0])
+                if daily_missing else 'Keine - alles im grünen Bereich!'
+            )
             
             # Format full context for AI
-            nutrition_context = f"""{daily_meals_text}
-{weekly_meals_text}
-
-NÄHRSTOFF-ÜBERSICHT HEUTE:
-- Kalorien: {daily_totals.get('calories', 0):.0f} / {daily_requirements.get('calories', 0):.0f} kcal
-- Protein: {daily_totals.get('protein_g', 0):.1f}g / {daily_requirements.get('protein_g', 0):.1f}g
-- Eisen: {daily_totals.get('iron_mg', 0):.1f}mg / {daily_requirements.get('iron_mg', 0):.1f}mg
-- Folsäure: {daily_totals.get('folate_mcg', 0):.1f}mcg / {daily_requirements.get('folate_mcg', 0):.1f}mcg
-- Kalzium: {daily_totals.get('calcium_mg', 0):.1f}mg / {daily_requirements.get('calcium_mg', 0):.1f}mg
-
-Fehlende Nährstoffe heute: {', '.join([k.replace('_', ' ').title() for k, v in daily_missing.items() if v > 0]) if daily_missing else 'Keine - alles im grünen Bereich!'}
-
-NÄHRSTOFF-ÜBERSICHT WOCHE:
-- Kalorien: {weekly_totals.get('calories', 0):.0f} / {weekly_requirements.get('calories', 0):.0f} kcal
-- Protein: {weekly_totals.get('protein_g', 0):.1f}g / {weekly_requirements.get('protein_g', 0):.1f}g
-- Eisen: {weekly_totals.get('iron_mg', 0):.1f}mg / {weekly_requirements.get('iron_mg', 0):.1f}mg
-"""
+            nutrition_context = _QA_NUTRITION_TEMPLATE.format(
+                daily_meals_text=daily_meals_text,
+                weekly_meals_text=weekly_meals_text,
+                day=NutrientTotals.from_dict(daily_analysis["totals"]),
+                day_req=NutrientTotals.from_dict(daily_analysis["requirements"]),
+                week=NutrientTotals.from_dict(weekly_analysis["totals"]),
+                week_req=NutrientTotals.from_dict(weekly_analysis["requirements"]),
+                missing_text=missing_text
+            )
         except Exception as e:
             nutrition_context = "Noch keine Mahlzeiten eingetragen. Schick mir ein Foto oder beschreib mir was du gegessen hast!"
         
-        prompt = f"""Du bist eine freundliche, unterstützende Ernährungsberaterin für eine schwangere Frau.
-
-{LANGUAGE_INSTRUCTION}
-
-WICHTIG: Du hast VOLLSTÄNDIGEN ZUGRIFF auf alle Daten unten. Beantworte Fragen DIREKT mit den vorhandenen Informationen. Frage NICHT nach Infos die du bereits hast!
-
-{profile_context}
-
-{trimester_focus}
-
-{nutrition_context}
-
-Frage der Nutzerin: "{question}"
-
-Antworte hilfreich, ermutigend und spezifisch. Du KENNST alle Daten oben - nutze sie! Wenn sie nach Mahlzeiten fragt, liste sie auf. Wenn sie nach Nährstoffen fragt, sei konkret. Halte es gesprächig und unterstützend."""
+        prompt = _QA_PROMPT_TEMPLATE.format(
+            nutrition_context=nutrition_context,
+            question=question
+        )
+        advice_question = _FOCUS_TOPIC_RE.search(question) is not None
+        if advice_question:
+            prompt = pregnancy_profile.get_trimester_focus_nutrients() + "\n\n" + prompt
         
-        response = self.client.chat.completions.create(
+        # The prompt embeds the full diary context, so a hit means nothing changed
+        async for chunk in self._stream_chat(
+            cache=True,
             model="gpt-4o-mini",
             messages=[
                 {
+                    # Instructions + the per-day memoized profile: a stable prefix all day
                     "role": "system",
-                    "content": f"Du bist eine freundliche Ernährungsberaterin für Schwangere. {LANGUAGE_INSTRUCTION} Du hast VOLLSTÄNDIGEN Zugriff auf das Ernährungstagebuch und Schwangerschaftsprofil der Nutzerin. Beantworte alle Fragen direkt mit den vorhandenen Daten - frag nie nach Infos die du schon hast!"
+                    "content": _QA_SYSTEM + "\n\n" + pregnancy_profile.get_context_string()
                 },
                 {
                     "role": "user",
                     "content": prompt
                 }
             ],
-            max_tokens=400,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content
+            max_tokens=300,  # Room for a full week's meal list; shorter answers stop early
+            # Advice may vary a little; diary lookups should just report the data
+            temperature=0.5 if advice_question else 0.2
+        ):
+            yield chunk
+
 
+@functools.lru_cache(maxsize=1)
+def get_openai_service() -> OpenAIService:
+    """
+    Get the process-wide OpenAIService.
+    
+    Handlers should use this instead of constructing their own service, so
+    all of them share one client and connection pool. close_shared_client()
+    releases the pool on shutdown.
+    
+    Returns:
+        The shared OpenAIService instance
+    """
+    return OpenAIService()
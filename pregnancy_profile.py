@@ -1,15 +1,104 @@
 """Pregnancy profile and personalized nutrition requirements."""
 from datetime import datetime, date
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
 
 # Language setting - all bot responses will be in this language
 LANGUAGE = "German"
 LANGUAGE_INSTRUCTION = f"IMPORTANT: Always respond in {LANGUAGE}."
 
+# Base requirements for pregnancy (total daily need)
+_BASE_REQUIREMENTS = {
+    "calories": 2200,
+    "protein_g": 71,
+    "carbohydrates_g": 175,
+    "fiber_g": 28,
+    "fat_g": 73,
+    "folate_mcg": 600,
+    "iron_mg": 27,
+    "calcium_mg": 1000,
+    "vitamin_d_iu": 600,
+    "vitamin_c_mg": 85,
+    "vitamin_a_mcg": 770,
+    "vitamin_b12_mcg": 2.6,
+    "zinc_mg": 11,
+    "omega3_g": 1.4
+}
+
+# Adjustments based on trimester
+_TRIMESTER_ADJUSTMENTS = {
+    # First trimester: Focus on folate, lower calorie needs
+    1: {
+        "calories": 1800,  # May eat less due to nausea
+        "folate_mcg": 600,  # Critical for neural tube development
+    },
+    # Second trimester: Increased calorie and protein needs
+    2: {
+        "calories": 2200,
+        "protein_g": 75,
+        "calcium_mg": 1000,
+    },
+    # Third trimester: Highest calorie and nutrient needs
+    3: {
+        "calories": 2400,
+        "protein_g": 80,
+        "iron_mg": 30,  # Increased blood volume
+        "calcium_mg": 1200,
+    },
+}
+
+# Static per trimester, so built once and shared read-only
+_REQUIREMENTS_BY_TRIMESTER = {
+    trimester: MappingProxyType({**_BASE_REQUIREMENTS, **adjustments})
+    for trimester, adjustments in _TRIMESTER_ADJUSTMENTS.items()
+}
+
 
 class PregnancyProfile:
     """Stores and calculates pregnancy-specific information."""
     
+    __slots__ = (
+        "age", "weight_kg", "height_cm", "health_status",
+        "pregnancy_start_date", "due_date", "due_date_text", "supplements",
+        "_week_date", "_week", "_context_date", "_context_string", "_food_requirements",
+    )
+    
+    _TRIMESTER_NAMES = ("First", "Second", "Third")
+    
+    # Key nutrients per trimester (in German).
+    # Note: Orthomol Natal already covers: Folate (800mcg), Vitamin D, B12, most vitamins
+    # Focus recommendations on what FOOD needs to provide
+    _FOCUS_TEXTS = (
+        """Wichtige Nährstoffe für das Erste Trimester:
+✅ FOLSÄURE: Durch Orthomol Natal VOLLSTÄNDIG abgedeckt (800mcg Metafolin)!
+✅ Vitamin D, B12, Zink: Auch durch Supplement abgedeckt
+
+🍽️ Aus der Nahrung wichtig:
+- PROTEIN: ca. 71g täglich (Fleisch, Fisch, Hülsenfrüchte, Eier)
+- KALZIUM: 850mg noch aus Nahrung (Milchprodukte, grünes Gemüse)
+- EISEN: noch 12mg aus Nahrung (rotes Fleisch, Spinat, Hülsenfrüchte)
+- Kleine, häufige Mahlzeiten helfen bei Übelkeit
+- Ingwertee kann bei Morgenübelkeit helfen""",
+        """Wichtige Nährstoffe für das Zweite Trimester:
+✅ Vitamine & Mikronährstoffe: Durch Orthomol Natal gut abgedeckt
+
+🍽️ Aus der Nahrung wichtig:
+- KALZIUM (850mg+): Babys Knochen entwickeln sich - viel Milch, Käse, Joghurt!
+- PROTEIN (75g+): Baby wächst schnell - mehr Fleisch, Fisch, Eier
+- EISEN: noch 12mg aus Nahrung - rotes Fleisch besonders gut
+- Omega-3 aus fettem Fisch (Lachs, Makrele) ergänzt das Supplement
+- Ballaststoffe für gute Verdauung""",
+        """Wichtige Nährstoffe für das Dritte Trimester:
+✅ Vitamine & Mikronährstoffe: Durch Orthomol Natal abgedeckt
+
+🍽️ Aus der Nahrung wichtig:
+- EISEN (15mg+): Vorbereitung auf Geburt - rotes Fleisch, Leber (in Maßen)
+- PROTEIN (80g+): Baby's letzter Wachstumsschub
+- KALZIUM: Weiterhin viel Milchprodukte
+- Omega-3 aus Fisch ergänzt DHA im Supplement
+- Ballaststoffe: Helfen bei häufiger Verstopfung (Vollkorn, Obst, Gemüse)""",
+    )
+    
     def __init__(self):
         """Initialize with user's pregnancy data."""
         # Personal information
@@ -23,6 +112,7 @@ class PregnancyProfile:
         # (conception ~2 weeks after last menstrual period)
         self.pregnancy_start_date = date(2025, 12, 2)  # Estimated start of pregnancy
         self.due_date = date(2026, 9, 7)  # ~40 weeks from start
+        self.due_date_text = self.due_date.strftime('%d.%m.%Y')  # As shown to the user
         
         # Supplementation - Orthomol Natal provides daily:
         # (per daily dose: 1 tablet + 1 capsule + probiotics)
@@ -51,12 +141,23 @@ class PregnancyProfile:
             }
         }
         
+        # Week and prompt context are recomputed only when the day changes
+        self._week_date = None
+        self._week = None
+        self._context_date = None
+        self._context_string = None
+        # Food requirements per trimester, derived from the supplement on first use
+        self._food_requirements = {}
+        
     def get_current_week(self) -> int:
         """Calculate current pregnancy week."""
         today = date.today()
-        days_pregnant = (today - self.pregnancy_start_date).days
-        weeks = days_pregnant // 7
-        return max(1, min(weeks, 42))  # Clamp between 1-42 weeks
+        if self._week_date != today:
+            days_pregnant = (today - self.pregnancy_start_date).days
+            weeks = days_pregnant // 7
+            self._week = max(1, min(weeks, 42))  # Clamp between 1-42 weeks
+            self._week_date = today
+        return self._week
     
     def get_trimester(self) -> int:
         """Get current trimester (1, 2, or 3)."""
@@ -70,11 +171,18 @@ class PregnancyProfile:
     
     def get_trimester_name(self) -> str:
         """Get trimester name."""
-        trimester = self.get_trimester()
-        return ["First", "Second", "Third"][trimester - 1]
+        return self._TRIMESTER_NAMES[self.get_trimester() - 1]
     
     def get_context_string(self) -> str:
         """Get a formatted string with pregnancy context for LLM prompts."""
+        today = date.today()
+        if self._context_date != today:
+            self._context_string = self._build_context_string()
+            self._context_date = today
+        return self._context_string
+    
+    def _build_context_string(self) -> str:
+        """Format the pregnancy context for the current week."""
         week = self.get_current_week()
         trimester = self.get_trimester()
         trimester_names_de = {1: "Erstes", 2: "Zweites", 3: "Drittes"}
@@ -88,7 +196,7 @@ class PregnancyProfile:
 - Gesundheitszustand: {self.health_status}
 - Aktuelle Schwangerschaftswoche: {week}
 - Trimester: {trimester_name} Trimester (Trimester {trimester})
-- Errechneter Geburtstermin: {self.due_date.strftime('%d.%m.%Y')}
+- Errechneter Geburtstermin: {self.due_date_text}
 
 NAHRUNGSERGÄNZUNG (täglich): {self.supplements['name']}
 Das Supplement liefert bereits:
@@ -117,106 +225,39 @@ Fokus auf: Protein, Kalzium, Eisen (ergänzend), Ballaststoffe, Omega-3 aus Nahr
             "omega3_g": (supp["omega3_dha_mg"] + supp["omega3_epa_mg"]) / 1000,  # ~0.23g
         }
     
-    def get_adjusted_requirements(self) -> Dict[str, float]:
+    def get_adjusted_requirements(self) -> Mapping[str, float]:
         """
         Get nutrition requirements adjusted for pregnancy stage.
         Requirements vary by trimester.
         These are TOTAL requirements (food + supplements).
+        The mapping is shared and read-only; use .copy() to modify it.
         """
-        week = self.get_current_week()
-        trimester = self.get_trimester()
-        
-        # Base requirements for pregnancy (total daily need)
-        requirements = {
-            "calories": 2200,
-            "protein_g": 71,
-            "carbohydrates_g": 175,
-            "fiber_g": 28,
-            "fat_g": 73,
-            "folate_mcg": 600,
-            "iron_mg": 27,
-            "calcium_mg": 1000,
-            "vitamin_d_iu": 600,
-            "vitamin_c_mg": 85,
-            "vitamin_a_mcg": 770,
-            "vitamin_b12_mcg": 2.6,
-            "zinc_mg": 11,
-            "omega3_g": 1.4
-        }
-        
-        # Adjust based on trimester
-        if trimester == 1:
-            # First trimester: Focus on folate, lower calorie needs
-            requirements["calories"] = 1800  # May eat less due to nausea
-            requirements["folate_mcg"] = 600  # Critical for neural tube development
-        elif trimester == 2:
-            # Second trimester: Increased calorie and protein needs
-            requirements["calories"] = 2200
-            requirements["protein_g"] = 75
-            requirements["calcium_mg"] = 1000
-        else:
-            # Third trimester: Highest calorie and nutrient needs
-            requirements["calories"] = 2400
-            requirements["protein_g"] = 80
-            requirements["iron_mg"] = 30  # Increased blood volume
-            requirements["calcium_mg"] = 1200
-        
-        return requirements
+        return _REQUIREMENTS_BY_TRIMESTER[self.get_trimester()]
     
-    def get_food_requirements(self) -> Dict[str, float]:
+    def get_food_requirements(self) -> Mapping[str, float]:
         """
         Get what still needs to come from FOOD after Orthomol Natal supplement.
         This is total requirements minus supplement contribution.
+        The mapping is shared and read-only; use .copy() to modify it.
         """
-        total_req = self.get_adjusted_requirements()
-        supplement = self.get_supplement_nutrients()
-        
-        food_req = {}
-        for nutrient, total in total_req.items():
-            supp_amount = supplement.get(nutrient, 0)
-            # Don't go negative - supplement may exceed requirements for some nutrients
-            food_req[nutrient] = max(0, total - supp_amount)
+        trimester = self.get_trimester()
+        food_req = self._food_requirements.get(trimester)
+        if food_req is None:
+            total_req = self.get_adjusted_requirements()
+            supplement = self.get_supplement_nutrients()
+            
+            food_req = {}
+            for nutrient, total in total_req.items():
+                supp_amount = supplement.get(nutrient, 0)
+                # Don't go negative - supplement may exceed requirements for some nutrients
+                food_req[nutrient] = max(0, total - supp_amount)
+            food_req = self._food_requirements[trimester] = MappingProxyType(food_req)
         
         return food_req
     
     def get_trimester_focus_nutrients(self) -> str:
         """Get key nutrients to focus on for current trimester (in German)."""
-        trimester = self.get_trimester()
-        
-        # Note: Orthomol Natal already covers: Folate (800mcg), Vitamin D, B12, most vitamins
-        # Focus recommendations on what FOOD needs to provide
-        
-        if trimester == 1:
-            return """Wichtige Nährstoffe für das Erste Trimester:
-✅ FOLSÄURE: Durch Orthomol Natal VOLLSTÄNDIG abgedeckt (800mcg Metafolin)!
-✅ Vitamin D, B12, Zink: Auch durch Supplement abgedeckt
-
-🍽️ Aus der Nahrung wichtig:
-- PROTEIN: ca. 71g täglich (Fleisch, Fisch, Hülsenfrüchte, Eier)
-- KALZIUM: 850mg noch aus Nahrung (Milchprodukte, grünes Gemüse)
-- EISEN: noch 12mg aus Nahrung (rotes Fleisch, Spinat, Hülsenfrüchte)
-- Kleine, häufige Mahlzeiten helfen bei Übelkeit
-- Ingwertee kann bei Morgenübelkeit helfen"""
-        elif trimester == 2:
-            return """Wichtige Nährstoffe für das Zweite Trimester:
-✅ Vitamine & Mikronährstoffe: Durch Orthomol Natal gut abgedeckt
-
-🍽️ Aus der Nahrung wichtig:
-- KALZIUM (850mg+): Babys Knochen entwickeln sich - viel Milch, Käse, Joghurt!
-- PROTEIN (75g+): Baby wächst schnell - mehr Fleisch, Fisch, Eier
-- EISEN: noch 12mg aus Nahrung - rotes Fleisch besonders gut
-- Omega-3 aus fettem Fisch (Lachs, Makrele) ergänzt das Supplement
-- Ballaststoffe für gute Verdauung"""
-        else:
-            return """Wichtige Nährstoffe für das Dritte Trimester:
-✅ Vitamine & Mikronährstoffe: Durch Orthomol Natal abgedeckt
-
-🍽️ Aus der Nahrung wichtig:
-- EISEN (15mg+): Vorbereitung auf Geburt - rotes Fleisch, Leber (in Maßen)
-- PROTEIN (80g+): Baby's letzter Wachstumsschub
-- KALZIUM: Weiterhin viel Milchprodukte
-- Omega-3 aus Fisch ergänzt DHA im Supplement
-- Ballaststoffe: Helfen bei häufiger Verstopfung (Vollkorn, Obst, Gemüse)"""
+        return self._FOCUS_TEXTS[self.get_trimester() - 1]
 
 
 # Global profile instance
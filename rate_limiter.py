@@ -0,0 +1,84 @@
+"""Client-side pacing of OpenAI requests to stay under account rate limits."""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class SlidingWindowRateLimiter:
+    """Limits how many requests and tokens may start within a sliding time window."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: Optional[int] = None,
+                 window_seconds: float = 60.0):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Maximum requests started per window
+            tokens_per_minute: Maximum estimated tokens per window (None for no token limit)
+            window_seconds: Length of the sliding window
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # Configured values stay the ceiling when server limits are applied
+        self._max_requests_per_minute = requests_per_minute
+        self._max_tokens_per_minute = tokens_per_minute
+        self.window_seconds = window_seconds
+        self._events = deque()  # (start time, tokens) per request in the window
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def apply_server_limits(self, requests_per_minute: Optional[int] = None,
+                            tokens_per_minute: Optional[int] = None):
+        """
+        Adopt the account limits reported by the API, capped at the configured values.
+        
+        Args:
+            requests_per_minute: Request limit from the server (None to keep the current one)
+            tokens_per_minute: Token limit from the server (None to keep the current one)
+        """
+        with self._lock:
+            if requests_per_minute:
+                self.requests_per_minute = min(requests_per_minute, self._max_requests_per_minute)
+            if tokens_per_minute:
+                if self._max_tokens_per_minute is None:
+                    self.tokens_per_minute = tokens_per_minute
+                else:
+                    self.tokens_per_minute = min(tokens_per_minute, self._max_tokens_per_minute)
+    
+    def _evict(self, now: float):
+        """Forget requests that have left the window."""
+        while self._events and self._events[0][0] <= now - self.window_seconds:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def _has_capacity(self, tokens: int) -> bool:
+        """Check whether a request of the given size fits into the current window."""
+        if len(self._events) >= self.requests_per_minute:
+            return False
+        if self.tokens_per_minute is None or not self._events:
+            # An oversized request still goes through once the window is empty
+            return True
+        return self._tokens_in_window + tokens <= self.tokens_per_minute
+
+    async def acquire(self, tokens: int = 0):
+        """
+        Wait until a request of the given estimated size may start, then record it.
+        
+        Waiting yields to the event loop; the thread lock only guards the
+        bookkeeping so the limiter also works across loops and threads.
+
+        Args:
+            tokens: Estimated prompt + completion tokens of the request
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._evict(now)
+                if self._has_capacity(tokens):
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+                wait = self._events[0][0] + self.window_seconds - now
+            await asyncio.sleep(max(wait, 0.01))
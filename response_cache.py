@@ -0,0 +1,65 @@
+"""In-process caching of OpenAI responses keyed by content hash."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Union
+
+
+def content_key(*parts: Union[str, bytes]) -> str:
+    """
+    Build a short, stable cache key from the given text/byte parts.
+
+    Args:
+        parts: Strings or bytes that together identify a request
+
+    Returns:
+        Hex digest usable as a cache key
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        # Length prefix keeps ("ab", "c") and ("a", "bc") apart
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with an optional time-to-live per entry."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Initialize an empty cache.
+
+        Args:
+            maxsize: Maximum number of entries before the least recently used is evicted
+            ttl: Seconds an entry stays valid (None keeps entries until evicted)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        """Store value under key, evicting the oldest entry if the cache is full."""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
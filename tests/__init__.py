@@ -0,0 +1,9 @@
+"""Tests for the pregnancy nutrition bot.
+
+config.py requires API credentials at import time; dummy values let the
+modules load without touching Telegram or OpenAI.
+"""
+import os
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
@@ -0,0 +1,52 @@
+"""Tests for NutritionAnalyzer that need no database or API access."""
+import unittest
+
+from analyzer import NutritionAnalyzer
+from meal_diary import MealDiary
+
+
+class FakeDiary:
+    """In-memory stand-in for MealDiary's read methods."""
+
+    def __init__(self, meals_by_user):
+        self.meals_by_user = meals_by_user
+
+    def get_daily_meals(self, user_id):
+        return self.meals_by_user.get(user_id, [])
+
+    def get_last_meal_id(self, user_id):
+        return len(self.meals_by_user.get(user_id, []))
+
+    sum_nutrients = staticmethod(MealDiary.sum_nutrients)
+
+
+class BatchRecommendationsTest(unittest.IsolatedAsyncioTestCase):
+    """Batch jobs use the same gaps as the interactive daily analysis."""
+
+    async def test_batch_jobs_match_daily_analysis(self):
+        analyzer = NutritionAnalyzer.__new__(NutritionAnalyzer)
+        analyzer.meal_diary = FakeDiary({
+            1: [{"nutrients": {"protein_g": 30, "iron_mg": 5}}],
+            2: [],
+        })
+        submitted = []
+
+        class FakeService:
+            async def submit_batch_recommendations(self, jobs):
+                submitted.extend(jobs)
+                return "batch-1"
+
+        analyzer.openai_service = FakeService()
+
+        self.assertEqual(await analyzer.submit_batch_recommendations([1, 2]), "batch-1")
+        for job in submitted:
+            analysis = await analyzer.analyze_daily_intake(job["custom_id"], with_recommendations=False)
+            self.assertEqual(job["missing_nutrients"], analysis["missing_nutrients"])
+            self.assertEqual(job["daily_totals"], analysis["totals"])
+            self.assertEqual(job["requirements"], analysis["requirements"])
+        self.assertEqual(submitted[0]["daily_totals"]["iron_mg"], 5)
+        self.assertEqual(submitted[1]["missing_nutrients"], submitted[1]["requirements"])
+
+
+if __name__ == "__main__":
+    unittest.main()
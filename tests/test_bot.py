@@ -0,0 +1,53 @@
+"""Tests for nutrient aggregation in the Telegram bot."""
+import types
+import unittest
+
+from bot import PregnancyNutritionBot
+from nutrition_db import NutritionDB
+
+
+class AggregateNutrientsTest(unittest.TestCase):
+    """Grounding LLM estimates in the nutrition knowledge base."""
+
+    def setUp(self):
+        # Only the knowledge base is needed; skip building the full bot
+        self.bot = types.SimpleNamespace(nutrition_db=NutritionDB())
+
+    def aggregate(self, food_items):
+        return PregnancyNutritionBot._aggregate_nutrients_from_items(self.bot, food_items)
+
+    def test_reference_overrides_estimate_but_keeps_missing_nutrients(self):
+        # The "eggs" entry has no iron or calcium
+        reference = self.bot.nutrition_db.lookup_nutrients("Eggs", 120)
+        self.assertNotIn("iron_mg", reference)
+        self.assertNotIn("calcium_mg", reference)
+
+        item = {
+            "name": "Eggs",
+            "quantity": 120,
+            "nutrients": {"calories": 999, "iron_mg": 2.1, "calcium_mg": 67}
+        }
+        totals = self.aggregate([item])
+
+        self.assertAlmostEqual(totals["calories"], reference["calories"])
+        self.assertAlmostEqual(totals["iron_mg"], 2.1)
+        self.assertAlmostEqual(totals["calcium_mg"], 67)
+
+    def test_grounded_values_are_written_back_to_the_item(self):
+        items = [
+            {"name": "Salmon", "quantity": 150, "nutrients": {"calories": 500, "iron_mg": 0.5}},
+            {"name": "Hausgemachte Suppe", "quantity": 300, "nutrients": {"calories": 200, "iron_mg": 1.5}},
+        ]
+        totals = self.aggregate(items)
+
+        self.assertAlmostEqual(items[0]["nutrients"]["iron_mg"], 0.5)
+        self.assertAlmostEqual(items[0]["nutrients"]["calories"], 208 * 1.5)
+        for nutrient in ("calories", "iron_mg", "omega3_g"):
+            self.assertAlmostEqual(
+                totals[nutrient],
+                sum(item["nutrients"].get(nutrient, 0) for item in items)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
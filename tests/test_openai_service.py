@@ -0,0 +1,65 @@
+"""Tests for OpenAIService helpers that need no API access."""
+import unittest
+
+from openai_service import OpenAIService, _local_intent
+
+
+class GenerateRecommendationsBulkTest(unittest.IsolatedAsyncioTestCase):
+    """Partial failures in bulk recommendation runs."""
+
+    async def run_bulk(self, failing_users):
+        service = OpenAIService()
+
+        async def fake_recommendations(missing_nutrients, daily_totals, requirements):
+            user = missing_nutrients["user"]
+            if user in failing_users:
+                raise TimeoutError(f"request for {user} timed out")
+            return f"Tipps für {user}"
+
+        service.generate_recommendations = fake_recommendations
+        jobs = [
+            {"missing_nutrients": {"user": user}, "daily_totals": {}, "requirements": {}}
+            for user in ("a", "b", "c", "d")
+        ]
+        return await service.generate_recommendations_bulk(jobs)
+
+    async def test_failing_job_keeps_other_results(self):
+        results = await self.run_bulk({"c"})
+        self.assertEqual(results, ["Tipps für a", "Tipps für b", None, "Tipps für d"])
+
+    async def test_failing_first_job_keeps_other_results(self):
+        results = await self.run_bulk({"a"})
+        self.assertEqual(results, [None, "Tipps für b", "Tipps für c", "Tipps für d"])
+
+
+
+class LocalIntentTest(unittest.TestCase):
+    """Messages classified without the LLM, and those left to it."""
+
+    def assertIntent(self, text, intent):
+        self.assertEqual(_local_intent(text), intent, text)
+
+    def test_clear_questions(self):
+        self.assertIntent("Was habe ich heute gegessen?", "question")
+        self.assertIntent("Welche Nährstoffe fehlen mir", "question")
+        self.assertIntent("Kann ich Sushi essen?", "question")
+
+    def test_clear_meal_logs(self):
+        self.assertIntent("Ich habe Müsli mit Milch gegessen", "meal_log")
+        self.assertIntent("I ate two eggs", "meal_log")
+
+    def test_question_word_with_food_report_goes_to_llm(self):
+        self.assertIntent("Was für ein leckeres Frühstück: Müsli mit Beeren", None)
+        self.assertIntent("Was habe ich heute gegessen", None)
+        self.assertIntent("Ich hatte 200g Reis, ist das genug?", None)
+
+    def test_ambiguous_english_goes_to_llm(self):
+        self.assertIntent("Can of tuna and rice", None)
+        self.assertIntent("I just had a question about iron", None)
+
+    def test_negated_meal_goes_to_llm(self):
+        self.assertIntent("Ich habe heute noch nichts gegessen", None)
+
+
+if __name__ == "__main__":
+    unittest.main()